@@ -0,0 +1,65 @@
+"""Size and speed of the binary IR (fitest_lang.binary) against JSON on a
+generated corpus: the benchmark programs with their numbers randomized.
+
+    poetry run python benchmarks/bench_binary_ir.py [-n REPEAT] [--programs N]
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import fitest_lang.dsl
+from fitest_lang import binary
+from fitest_lang.program import Program
+from corpus import PROGRAMS
+
+
+def generate(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        re.sub(r"\b\d+\b", lambda m: str(rng.randint(1, 500)), rng.choice(PROGRAMS))
+        for _ in range(n)
+    ]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("-n", "--repeat", type=int, default=5)
+    arg_parser.add_argument("--programs", type=int, default=2000)
+    args = arg_parser.parse_args()
+
+    programs = [fitest_lang.dsl.parse_program(s, cache=False) for s in generate(args.programs)]
+    irs = [p.to_ir() for p in programs]
+    formats = {
+        "json (to_json)": (lambda ir: json.dumps(ir, indent=1).encode(), json.loads),
+        "json (compact)": (lambda ir: json.dumps(ir, separators=(",", ":")).encode(), json.loads),
+        "binary": (binary.encode, binary.decode),
+    }
+
+    print("%d programs" % len(irs))
+    print("%-16s %10s %10s %12s %12s" % ("format", "bytes", "gzip", "encode (ms)", "decode (ms)"))
+    for name, (encode, decode) in formats.items():
+        blobs = [encode(ir) for ir in irs]
+        assert all(decode(b) == ir for b, ir in zip(blobs, irs))
+        size = sum(map(len, blobs))
+        gz = len(gzip.compress(b"\n".join(blobs)))
+        t_encode = min(timeit.repeat(lambda: [encode(ir) for ir in irs], number=1, repeat=args.repeat))
+        t_decode = min(timeit.repeat(lambda: [decode(b) for b in blobs], number=1, repeat=args.repeat))
+        print("%-16s %10d %10d %12.1f %12.1f" % (name, size, gz, 1e3 * t_encode, 1e3 * t_decode))
+
+    blobs = [p.to_bytes() for p in programs]
+    jsons = [p.to_json() for p in programs]
+    t_bytes = min(timeit.repeat(lambda: [Program.from_bytes(b) for b in blobs], number=1, repeat=args.repeat))
+    t_json = min(timeit.repeat(lambda: [Program.from_json(s) for s in jsons], number=1, repeat=args.repeat))
+    print("Program.from_json  %8.1f ms" % (1e3 * t_json))
+    print("Program.from_bytes %8.1f ms" % (1e3 * t_bytes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Program.from_ir with the class-keyed dispatch table vs the previous
+dispatch that formatted every textX object with str() and sliced the result.
+
+    poetry run python benchmarks/bench_from_ir.py [-n REPEAT]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import fitest_lang.dsl
+from fitest_lang import baseobject
+from fitest_lang.baseobject import FitestObject
+from fitest_lang.program import Program
+from corpus import PROGRAMS
+
+
+def str_dispatch(textx_type):
+    # what the per-module textx_type_class implementations used to do
+    t = str(textx_type)
+    if "Value" in t:
+        name = "Value"
+    elif "Variable" in t:
+        name = "Variable"
+    else:
+        name = t[t.find(".") + 1: t.find(" ")]
+    return baseobject._ir_classes[name]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("-n", "--repeat", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    # a long ladder program so per-node dispatch dominates
+    ladder = "for N in " + " ".join(map(str, range(100, 0, -1))) + ":\n" + "\n".join(
+        ["N 95 lb barbell thruster", "(N / 2) pullup", "(N * 2) double_under",
+         "400 meter run", "(N + 5) 20 lb 14 ft wallball"] * 20
+    ) + " ;"
+    models = [fitest_lang.dsl.parse(s) for s in PROGRAMS + [ladder]]
+
+    def bench():
+        return min(
+            timeit.repeat(
+                lambda: [Program.from_ir(m) for m in models], number=1, repeat=args.repeat
+            )
+        )
+
+    after = bench()
+    dispatch = FitestObject.__dict__["textx_type_class"]
+    FitestObject.textx_type_class = staticmethod(str_dispatch)
+    try:
+        before = bench()
+    finally:
+        FitestObject.textx_type_class = dispatch
+    print("str() dispatch    %8.2f ms" % (1e3 * before))
+    print("class-keyed table %8.2f ms" % (1e3 * after))
+    print("speedup %.2fx" % (before / after))
+
+
+if __name__ == "__main__":
+    main()
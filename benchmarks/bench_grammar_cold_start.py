@@ -0,0 +1,62 @@
+"""Cold-start benchmark: first `dsl.parse` in a fresh process.
+
+Compares compiling `dsl.tx` with `textx.metamodel_from_file` against
+loading the precompiled grammar artifact from the on-disk cache.
+
+    poetry run python benchmarks/bench_grammar_cold_start.py [-n RUNS]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+CHILD = """
+import time
+t0 = time.perf_counter()
+import fitest_lang.dsl
+t1 = time.perf_counter()
+fitest_lang.dsl.parse("for N in 21 15 9:\\nN 95 lb barbell thruster\\nN pullup ;")
+t2 = time.perf_counter()
+print(t1 - t0, t2 - t1)
+"""
+
+
+def run(env):
+    out = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", CHILD],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return [float(x) for x in out.split()]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("-n", "--runs", type=int, default=10)
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        base = dict(os.environ, FITEST_LANG_CACHE_DIR=cache_dir)
+        # populate the cache once, as `make grammar-cache` would
+        run(dict(base, FITEST_LANG_GRAMMAR_CACHE_WRITE="1"))
+        assert os.listdir(cache_dir), "grammar artifact was not written"
+        cases = [
+            ("metamodel_from_file", dict(base, FITEST_LANG_GRAMMAR_CACHE="0")),
+            ("grammar artifact", base),
+        ]
+        print("%-20s %12s %16s" % ("path", "import (ms)", "first parse (ms)"))
+        for name, env in cases:
+            times = [run(env) for _ in range(args.runs)]
+            print(
+                "%-20s %12.1f %16.1f"
+                % (
+                    name,
+                    1000 * statistics.median(t[0] for t in times),
+                    1000 * statistics.median(t[1] for t in times),
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
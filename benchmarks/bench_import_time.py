@@ -0,0 +1,70 @@
+"""Startup cost of importing each fitest_lang module in a fresh process.
+
+Runs `python -X importtime -c "import <module>"` per module and reports the
+median cumulative import time, the time spent in fitest_lang's own modules,
+and which heavy dependencies got loaded along the way.
+
+    poetry run python benchmarks/bench_import_time.py [-n RUNS] [--top N]
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+
+MODULES = [
+    "fitest_lang.dsl",
+    "fitest_lang.program",
+    "fitest_lang.quantity",
+    "fitest_lang.movement",
+    "fitest_lang.power",
+    "fitest_lang.work_model",
+]
+HEAVY = ["numpy", "pint", "pandas", "textx"]
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def run(module):
+    """{imported module: (self us, cumulative us)} for one fresh import of `module`."""
+    err = subprocess.run(
+        [sys.executable, "-W", "ignore", "-X", "importtime", "-c", "import " + module],
+        check=True, capture_output=True, text=True,
+    ).stderr
+    times = {}
+    for m in LINE.finditer(err):
+        times[m.group(4)] = (int(m.group(1)), int(m.group(2)))
+    return times
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("-n", "--runs", type=int, default=5)
+    arg_parser.add_argument("--top", type=int, default=3,
+                            help="slowest fitest_lang modules to list per import")
+    args = arg_parser.parse_args()
+
+    print("%-24s %10s %14s  %-24s %s" % ("module", "total (ms)", "fitest (ms)", "heavy deps", "slowest own"))
+    for module in MODULES:
+        runs = [run(module) for _ in range(args.runs)]
+        total = statistics.median(r[module][1] for r in runs) / 1000
+        own = {
+            name: statistics.median(r[name][0] for r in runs) / 1000
+            for name in runs[0]
+            if name.startswith("fitest_lang")
+        }
+        heavy = [name for name in HEAVY if name in runs[0]]
+        slowest = sorted(own.items(), key=lambda kv: -kv[1])[: args.top]
+        print(
+            "%-24s %10.1f %14.1f  %-24s %s"
+            % (
+                module,
+                total,
+                sum(own.values()),
+                ",".join(heavy) or "-",
+                ", ".join("%s %.1f" % (name.split(".")[-1], t) for name, t in slowest),
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Parse throughput of the textX engine vs the hand-written fast parser.
+
+    poetry run python benchmarks/bench_parse_engines.py [-n REPEAT]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import fitest_lang.dsl
+from corpus import PROGRAMS
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("-n", "--repeat", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    fitest_lang.dsl.warmup()
+    results = {}
+    for engine in ["textx", "fast"]:
+        secs = min(
+            timeit.repeat(
+                lambda: [fitest_lang.dsl.parse(s, engine=engine) for s in PROGRAMS],
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        results[engine] = secs / len(PROGRAMS)
+        print("%-6s %10.1f us/program" % (engine, 1e6 * results[engine]))
+    print("speedup %.1fx" % (results["textx"] / results["fast"]))
+
+
+if __name__ == "__main__":
+    main()
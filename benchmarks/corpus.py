@@ -0,0 +1,8 @@
+"""Program strings shared by the benchmarks: the test suite's corpus, a
+plain data module with no imports."""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "tests"))
+
+from programs import TEST_PROGRAMS as PROGRAMS
@@ -1,8 +1,31 @@
+from collections import namedtuple
+from types import FunctionType
+
 from .baseobject import FitestBaseObject
-from .quantity import Quantity, Length, Weight
+from .quantity import G_0, Quantity, Length, Weight, to_si
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# derived anthropometrics used by the movement physics; `weight` is a force
+AthleteMeasures = namedtuple(
+    "AthleteMeasures",
+    ["mass", "weight", "height", "shoulder_height", "arm_length", "squat_bottom_height"],
+)
 
 
 class Athlete(FitestBaseObject):
+    __slots__ = (
+        "name",
+        "weight",
+        "height",
+        "shoulder_height",
+        "arm_length",
+        "squat_bottom_height",
+        "_quantities",
+        "_si",
+    )
+
     def __init__(
         self,
         name,
@@ -37,12 +60,41 @@ class Athlete(FitestBaseObject):
                 squat_bottom_height.magnitude, squat_bottom_height.units
             )
 
+    def __setattr__(self, name, value):
+        # derived measures are computed once and dropped whenever a
+        # measurement changes
+        object.__setattr__(self, name, value)
+        if not name.startswith("_"):
+            object.__setattr__(self, "_quantities", None)
+            object.__setattr__(self, "_si", None)
+
+    @property
+    def quantities(self):
+        """Derived measures as pint Quantities."""
+        if self._quantities is None:
+            self._quantities = AthleteMeasures(
+                mass=self.weight,
+                weight=(self.weight * Quantity("g_0")).to("force_pound"),
+                height=self.height,
+                shoulder_height=self.shoulder_height,
+                arm_length=self.arm_length,
+                squat_bottom_height=self.squat_bottom_height,
+            )
+        return self._quantities
+
+    @property
+    def si(self):
+        """Derived measures as floats in SI units (kg, N, m)."""
+        if self._si is None:
+            self._si = AthleteMeasures(*[to_si(q) for q in self.quantities])
+        return self._si
+
     def get_height(self):
         return self.height
 
     def get_weight(self, as_force=True):
         if as_force:
-            return (self.weight * Quantity("g_0")).to("force_pound")
+            return self.quantities.weight
         else:
             return self.weight
 
@@ -54,3 +106,119 @@ class Athlete(FitestBaseObject):
 
     def get_shoulder_height(self):
         return self.shoulder_height
+
+    def __eq__(self, other):
+        if type(other) != type(self):
+            return NotImplemented
+        return self.name == other.name and self.si == other.si
+
+    def __hash__(self):
+        return hash((self.name, self.si))
+
+
+class AthleteCohort:
+    """Struct-of-arrays view of many athletes, for computing work for all of
+    them in one vectorized pass (see `get_work_cohort`).
+
+    Measurements are arrays in SI units with one entry per athlete: `weight`
+    is body mass in kg, lengths are in m. Missing lengths default to the same
+    fractions of height as `Athlete`.
+    """
+
+    __slots__ = (
+        "names",
+        "weight",
+        "height",
+        "shoulder_height",
+        "arm_length",
+        "squat_bottom_height",
+        "_quantities",
+        "_si",
+    )
+
+    def __init__(
+        self,
+        weight,
+        height,
+        shoulder_height=None,
+        arm_length=None,
+        squat_bottom_height=None,
+        names=None,
+    ):
+        self.weight = np.asarray(weight, dtype=float)
+        self.height = np.asarray(height, dtype=float)
+        self.shoulder_height = (
+            0.75 * self.height
+            if shoulder_height is None
+            else np.asarray(shoulder_height, dtype=float)
+        )
+        self.arm_length = (
+            0.4 * self.height if arm_length is None else np.asarray(arm_length, dtype=float)
+        )
+        self.squat_bottom_height = (
+            0.45 * self.height
+            if squat_bottom_height is None
+            else np.asarray(squat_bottom_height, dtype=float)
+        )
+        self.names = names
+
+    @classmethod
+    def from_athletes(cls, athletes):
+        measures = [a.si for a in athletes]
+        return cls(
+            weight=[m.mass for m in measures],
+            height=[m.height for m in measures],
+            shoulder_height=[m.shoulder_height for m in measures],
+            arm_length=[m.arm_length for m in measures],
+            squat_bottom_height=[m.squat_bottom_height for m in measures],
+            names=[a.name for a in athletes],
+        )
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if not name.startswith("_"):
+            object.__setattr__(self, "_quantities", None)
+            object.__setattr__(self, "_si", None)
+
+    def __len__(self):
+        return len(self.weight)
+
+    @property
+    def si(self):
+        """Derived measures as SI float columns, shape (athletes, 1).
+
+        Athletes run along the first axis so that per-round arrays of a rep
+        ladder broadcast against them.
+        """
+        if self._si is None:
+            mass = self.weight[:, None]
+            self._si = AthleteMeasures(
+                mass=mass,
+                weight=mass * G_0,
+                height=self.height[:, None],
+                shoulder_height=self.shoulder_height[:, None],
+                arm_length=self.arm_length[:, None],
+                squat_bottom_height=self.squat_bottom_height[:, None],
+            )
+        return self._si
+
+    @property
+    def quantities(self):
+        """Derived measures as pint Quantities of the `si` columns."""
+        if self._quantities is None:
+            units = ["kg", "newton", "meter", "meter", "meter", "meter"]
+            self._quantities = AthleteMeasures(
+                *[Quantity(x, u) for x, u in zip(self.si, units)]
+            )
+        return self._quantities
+
+    def work_array(self, work, work_units="cal"):
+        """Turn the result of `get_work` for this cohort into an array of
+        magnitudes in `work_units`, one per athlete (or a function of the
+        scores returning one)."""
+        if type(work) == FunctionType:
+            return lambda scores: self.work_array(work(scores), work_units)
+        # a scalar (work that does not depend on the athlete) or an
+        # (athletes, 1) column
+        magnitude = np.reshape(work.to(work_units).magnitude, (-1, 1))
+        return np.broadcast_to(magnitude, (len(self), 1)).reshape(len(self))
@@ -1,8 +1,22 @@
 from copy import deepcopy, copy
 import json
 
+from . import binary
+
+
+# sections of the envelope returned by `to_ir(top=True)`; each is computed
+# only when asked for
+TOP_SECTIONS = {
+    "ir": lambda obj: obj.to_ir(),
+    "str": lambda obj: obj.__str__(),
+    "timer_objs": lambda obj: obj.to_timer_objs().to_json(),
+}
+
 
 class FitestBaseObject(object):
+    __slots__ = ()
+    top_sections = ("ir", "str")
+
     @classmethod
     def cls_name(cls):
         cl_name = str(cls)
@@ -23,15 +37,72 @@ class FitestBaseObject(object):
         return deepcopy(self)
 
 
+# type dispatch: grammar rule / IR node name -> FitestObject subclass, and
+# model class (textX or fast_parser) -> FitestObject subclass
+_ir_classes = {}
+_model_classes = {}
+
+
+def register_model_classes(model_classes):
+    """Map each model class to the FitestObject subclass with the same rule name.
+
+    Called once per metamodel; classes that are not registered up front are
+    resolved by name on first use.
+    """
+    for model_class in model_classes:
+        cls = _ir_classes.get(model_class.__name__)
+        if cls is not None:
+            _model_classes[model_class] = cls
+
+
 class FitestObject:
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _ir_classes[cls.__name__] = cls
+
     @staticmethod
     def textx_type_class(textx_type):
-        raise NotImplementedError
+        model_class = type(textx_type)
+        try:
+            return _model_classes[model_class]
+        except KeyError:
+            pass
+        try:
+            cls = _ir_classes[model_class.__name__]
+        except KeyError:
+            raise TypeError("no fitest_lang class for model type: " + model_class.__name__)
+        _model_classes[model_class] = cls
+        return cls
+
+    @staticmethod
+    def ir_type_class(ir):
+        (t,) = ir.keys()
+        try:
+            return _ir_classes[t[t.find(".") + 1:]]
+        except KeyError:
+            raise TypeError("no fitest_lang class for IR node: " + t)
+
+    @staticmethod
+    def ir_body(ir):
+        (body,) = ir.values()
+        return body
 
     @classmethod
     def from_ir(cls, args):
         raise NotImplementedError
 
+    @classmethod
+    def from_dict(cls, ir):
+        raise NotImplementedError
+
+    @classmethod
+    def from_json(cls, s):
+        return cls.from_dict(json.loads(s))
+
+    @classmethod
+    def from_bytes(cls, b):
+        return cls.from_dict(binary.decode(b))
+
     @classmethod
     def to_ir(cls, args):
         raise NotImplementedError
@@ -44,5 +115,18 @@ class FitestObject:
     def ir_to_timer_objs(cls, ir, env={}, eval_exprs=False):
         return cls.from_ir(ir).to_timer_objs(env=env, eval_exprs=eval_exprs)
 
-    def to_json(self, top=True):
-        return json.dumps(self.to_ir(top), indent=1)
+    def top_ir(self, sections=None):
+        """Top-level envelope of `sections` (default `top_sections`), in order."""
+        top = {"type": type(self).__name__}
+        for section in self.top_sections if sections is None else sections:
+            if section not in TOP_SECTIONS:
+                raise ValueError("unknown top-level IR section: " + repr(section))
+            top[section] = TOP_SECTIONS[section](self)
+        return top
+
+    def to_json(self, top=True, sections=None):
+        return json.dumps(self.top_ir(sections) if top else self.to_ir(), indent=1)
+
+    def to_bytes(self):
+        """`to_ir` in the compact binary format of `binary`."""
+        return binary.encode(self.to_ir())
@@ -0,0 +1,198 @@
+import struct
+
+# Compact binary encoding of the IR (the JSON-compatible dicts of `to_ir`).
+#
+# A blob is MAGIC, a version byte and one encoded value. Values start with a
+# tag byte; integers 0-127 fit in the tag itself, other integers are zigzag
+# varints. Strings (keys included) are varint references into STRINGS, the
+# names, units and movements of the language known to this version, followed
+# by the strings met earlier in the blob; reference 0 introduces a new one
+# (varint byte length, then UTF-8). Dicts with a single key, which is how
+# every IR node is keyed by its class, skip the length.
+#
+# STRINGS is part of the format: only ever append to it, in a new version.
+
+MAGIC = b"FIR"
+VERSION = 1
+
+STRINGS = (
+    # IR keys
+    "magnitude", "Value", "units", "mvmt_type", "movements", "rest", "seq",
+    "reps", "time", "height", "weight", "object", "name", "ints", "left",
+    "ops", "right", "Program",
+    # node classes
+    "MovementSeq", "Rest", "EnduranceMovement", "ObjectMovement",
+    "GymnasticMovement", "GymnasticMovementType", "TaskPriority",
+    "TaskPriorityBase", "TimePriority", "TimePriorityBase", "TimeCappedTask",
+    "quantity.Length", "quantity.Weight", "quantity.Work",
+    "quantity.Repetition", "quantity.Time", "Expression", "Sum", "Product",
+    "Variable",
+    # operators
+    "+", "-", "*", "/", "",
+    # units
+    "meter", "km", "mile", "ft", "inch", "lb", "pound", "kg", "kilogram",
+    "cal", "sec", "min", "hr", "rounds", "cycles",
+    # objects
+    "barbell", "dumbbell", "dumbell", "dumbells", "kettlebell", "kettlebells",
+    # movements
+    "airbike", "back_extension", "back_squat", "bench_press", "bike",
+    "box_jump", "burpee", "burpee_pullup", "clean", "clean_and_jerk",
+    "deadlift", "dip", "double_under", "front_squat", "ghd_situp",
+    "ground_to_overhead", "handstand_pushup", "handstand_walk", "hang_clean",
+    "hip_extension", "knee_to_elbow", "muscle_up", "overhead_squat", "pistol",
+    "pullup", "push_jerk", "push_press", "pushup", "row", "run",
+    "shoulder_to_overhead", "situp", "ski", "snatch", "split_jerk", "squat",
+    "sumodeadlift", "sumodeadlift_highpull", "swim", "swing", "thruster",
+    "toe_to_bar", "wallball",
+)
+_STRING_INDEX = {s: i for i, s in enumerate(STRINGS)}
+
+NONE, FALSE, TRUE, INT, FLOAT, STR, LIST, DICT, NODE = range(9)
+SMALL_INT = 0x80
+_double = struct.Struct("<d")
+
+
+def encode(ir):
+    """Binary encoding of the IR `ir`."""
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    _encode(ir, out, dict(_STRING_INDEX))
+    return bytes(out)
+
+
+def decode(data):
+    """IR encoded by `encode`; raises ValueError on anything else."""
+    if len(data) <= len(MAGIC) or data[: len(MAGIC)] != MAGIC:
+        raise ValueError("not a binary fitest_lang IR")
+    version = data[len(MAGIC)]
+    if version != VERSION:
+        raise ValueError("unsupported binary IR version: %d" % version)
+    try:
+        ir, pos = _decode(data, len(MAGIC) + 1, list(STRINGS))
+    except (IndexError, RecursionError):
+        raise ValueError("truncated or corrupt binary IR")
+    if pos != len(data):
+        raise ValueError("trailing bytes after binary IR")
+    return ir
+
+
+def _encode(x, out, strings):
+    t = type(x)
+    if t == dict:
+        if len(x) == 1:
+            out.append(NODE)
+        else:
+            out.append(DICT)
+            _write_varint(len(x), out)
+        for k, v in x.items():
+            _write_str(k, out, strings)
+            _encode(v, out, strings)
+    elif t == list:
+        out.append(LIST)
+        _write_varint(len(x), out)
+        for v in x:
+            _encode(v, out, strings)
+    elif t == str:
+        out.append(STR)
+        _write_str(x, out, strings)
+    elif t == int:
+        if 0 <= x < SMALL_INT:
+            out.append(SMALL_INT | x)
+        else:
+            out.append(INT)
+            _write_varint(x << 1 if x >= 0 else (-x << 1) - 1, out)
+    elif t == float:
+        out.append(FLOAT)
+        out += _double.pack(x)
+    elif x is None:
+        out.append(NONE)
+    elif t == bool:
+        out.append(TRUE if x else FALSE)
+    else:
+        raise TypeError("cannot encode IR value of type: " + t.__name__)
+
+
+def _write_varint(n, out):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _write_str(s, out, strings):
+    i = strings.get(s)
+    if i is None:
+        strings[s] = len(strings)
+        b = s.encode("utf-8")
+        out.append(0)
+        _write_varint(len(b), out)
+        out += b
+    else:
+        _write_varint(i + 1, out)
+
+
+def _decode(data, pos, strings):
+    tag = data[pos]
+    pos += 1
+    if tag & SMALL_INT:
+        return tag & 0x7F, pos
+    if tag == NODE:
+        k, pos = _read_str(data, pos, strings)
+        v, pos = _decode(data, pos, strings)
+        return {k: v}, pos
+    if tag == STR:
+        return _read_str(data, pos, strings)
+    if tag == LIST:
+        n, pos = _read_varint(data, pos)
+        items = []
+        for _ in range(n):
+            v, pos = _decode(data, pos, strings)
+            items.append(v)
+        return items, pos
+    if tag == DICT:
+        n, pos = _read_varint(data, pos)
+        d = {}
+        for _ in range(n):
+            k, pos = _read_str(data, pos, strings)
+            d[k], pos = _decode(data, pos, strings)
+        return d, pos
+    if tag == INT:
+        n, pos = _read_varint(data, pos)
+        return (n >> 1) ^ -(n & 1), pos
+    if tag == FLOAT:
+        if pos + 8 > len(data):
+            raise IndexError
+        return _double.unpack_from(data, pos)[0], pos + 8
+    if tag == NONE:
+        return None, pos
+    if tag == FALSE:
+        return False, pos
+    if tag == TRUE:
+        return True, pos
+    raise ValueError("unknown binary IR tag: %d" % tag)
+
+
+def _read_varint(data, pos):
+    n = shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _read_str(data, pos, strings):
+    i = data[pos]
+    if 0 < i < 0x80:
+        return strings[i - 1], pos + 1
+    i, pos = _read_varint(data, pos)
+    if i:
+        return strings[i - 1], pos
+    n, pos = _read_varint(data, pos)
+    if pos + n > len(data):
+        raise IndexError
+    s = bytes(data[pos : pos + n]).decode("utf-8")
+    strings.append(s)
+    return s, pos + n
@@ -1,17 +1,267 @@
-import importlib.resources
-
-import textx
+import collections
+import concurrent.futures
+import hashlib
+import itertools as it
+import os
+import pickle
+import threading
+import warnings
+from pathlib import Path
 
 from . import config
+from .baseobject import register_model_classes
+from . import fast_parser
+from . import grammar_cache
+from .lazy import lazy_import
+
+textx = lazy_import("textx")
+
+# set FITEST_LANG_GRAMMAR_CACHE=0 to always compile the grammar with textX
+GRAMMAR_CACHE = os.environ.get("FITEST_LANG_GRAMMAR_CACHE", "1") != "0"
+# set FITEST_LANG_GRAMMAR_CACHE_WRITE=1 to also write missing artifacts to the
+# cache directory (see `grammar_cache`); `make grammar-cache` writes it once
+GRAMMAR_CACHE_WRITE = os.environ.get("FITEST_LANG_GRAMMAR_CACHE_WRITE", "0") != "0"
+# number of parsed programs kept by `parse_program`; 0 disables the cache
+PROGRAM_CACHE_SIZE = int(os.environ.get("FITEST_LANG_PROGRAM_CACHE_SIZE", "1024"))
+
+
+# metamodel cache
+_metamodel = None
+_metamodel_lock = threading.Lock()
+_grammar_path = None
+
+
+def get_metamodel():
+    """Return the process-wide textX metamodel, compiling the grammar on first use."""
+    global _metamodel
+    mm = _metamodel
+    if mm is None:
+        with _metamodel_lock:
+            if _metamodel is None:
+                mm = _build_metamodel(_grammar_path)
+                _register_metamodel(mm)
+                _metamodel = mm
+            mm = _metamodel
+    return mm
+
+
+def warmup():
+    """Compile the grammar now instead of on the first call to `parse`."""
+    return get_metamodel()
+
+
+def reset(grammar_path=None):
+    """Drop the cached metamodel, optionally switching to another grammar file.
+
+    The next call to `parse` (or `warmup`) recompiles from `grammar_path`, or
+    from the packaged `config/dsl.tx` when it is None.
+    """
+    global _metamodel, _grammar_path
+    with _metamodel_lock:
+        _metamodel = None
+        _grammar_path = grammar_path
+
+
+def _register_metamodel(mm):
+    # build the textX class -> fitest_lang class dispatch table up front
+    from . import program
+
+    register_model_classes(mm)
+
+
+def _read_grammar(grammar_path=None):
+    if grammar_path is not None:
+        path = Path(grammar_path)
+    else:
+        from importlib.resources import files
+
+        path = files(config).joinpath("dsl.tx")
+    return str(path), path.read_text(encoding="utf-8")
+
+
+def _build_metamodel(grammar_path=None):
+    # the grammar and its artifact are only read here, on first use, so that
+    # importing this module (or parsing with the fast engine) touches no files
+    file_name, grammar = _read_grammar(grammar_path)
+    if GRAMMAR_CACHE:
+        try:
+            artifact = grammar_cache.read_artifact(grammar)
+            if artifact is None and GRAMMAR_CACHE_WRITE:
+                artifact = grammar_cache.compile_artifact(grammar)
+                grammar_cache.write_artifact(grammar, artifact=artifact)
+            if artifact is not None:
+                return grammar_cache.metamodel_from_artifact(artifact, file_name=file_name)
+        except (OSError, ValueError, EOFError) as e:
+            # unwritable cache directory, or an artifact that is corrupt or
+            # written by another textX version (ArtifactVersionError)
+            warnings.warn(
+                "grammar cache not used, compiling the grammar with textX: %s" % e,
+                RuntimeWarning,
+            )
+    return textx.metamodel_from_file(file_name)
 
 
 # utils
-def parse(s):
-    with importlib.resources.path(config, 'dsl.tx') as path:
-        dsl = textx.metamodel_from_file(path)
-    program = dsl.model_from_str(s)
+def parse(s, engine="textx"):
+    """Parse a program string into a model for `Program.from_ir`.
+
+    `engine="fast"` uses the hand-written parser in `fast_parser`, which
+    builds an equivalent model without going through textX.
+    """
+    if engine == "textx":
+        program = get_metamodel().model_from_str(s)
+    elif engine == "fast":
+        program = fast_parser.parse(s)
+    else:
+        raise ValueError("unknown parse engine: %r" % (engine,))
+    return program
+
+
+# program cache
+class ProgramCache:
+    """Thread-safe LRU cache of built programs keyed by normalised program text.
+
+    Whitespace only separates tokens in the DSL, so program strings that
+    differ only in whitespace share an entry. Entries are kept pickled and
+    `get` unpickles a fresh program each time, so callers may mutate what they
+    get (and what they `put`); unpickling is several times cheaper than a deep
+    copy.
+    """
+
+    def __init__(self, maxsize=PROGRAM_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._programs = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(s):
+        return hashlib.sha1(" ".join(s.split()).encode("utf-8")).hexdigest()
+
+    def get(self, s):
+        key = self.key(s)
+        with self._lock:
+            program = self._programs.get(key)
+            if program is None:
+                self.misses += 1
+                return None
+            self._programs.move_to_end(key)
+            self.hits += 1
+        return pickle.loads(program)
+
+    def put(self, s, program):
+        if self.maxsize <= 0:
+            return
+        key = self.key(s)
+        program = pickle.dumps(program, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._programs[key] = program
+            self._programs.move_to_end(key)
+            while len(self._programs) > self.maxsize:
+                self._programs.popitem(last=False)
+                self.evictions += 1
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._programs) > max(maxsize, 0):
+                self._programs.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._programs.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._programs),
+                "maxsize": self.maxsize,
+            }
+
+    def __len__(self):
+        return len(self._programs)
+
+
+program_cache = ProgramCache()
+
+
+def parse_program(s, engine="textx", cache=True):
+    """Parse `s` and build its program, going through `program_cache`."""
+    from .program import Program
+
+    use_cache = cache and program_cache.maxsize > 0
+    if use_cache:
+        program = program_cache.get(s)
+        if program is not None:
+            return program
+    program = Program.from_ir(parse(s, engine=engine))
+    if use_cache:
+        program_cache.put(s, program)
     return program
 
 
+class ParseError(ValueError):
+    """A program in a `parse_many` batch that could not be parsed or loaded."""
+
+    def __init__(self, message, line=None, col=None):
+        super().__init__(message)
+        self.line = line
+        self.col = col
+
+
+def parse_many(programs, workers=None, chunksize=256, engine="textx"):
+    """Parse program strings and build their `Program` objects in parallel.
+
+    Chunks of `chunksize` strings are handed to a pool of `workers` processes
+    (default: one per CPU, `workers=1` parses in this process), each of which
+    compiles the grammar once when it starts. Returns a list in input order
+    holding the built program, or a `ParseError` for each string that failed.
+    """
+    programs = iter(programs)
+    chunks = iter(lambda: list(it.islice(programs, chunksize)), [])
+    if workers == 1:
+        _init_worker(_grammar_path, engine)
+        results = map(_parse_chunk, chunks, it.repeat(engine))
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(_grammar_path, engine),
+        )
+        with executor:
+            results = list(executor.map(_parse_chunk, chunks, it.repeat(engine)))
+    return [r for chunk in results for r in chunk]
+
+
+def _init_worker(grammar_path, engine):
+    if grammar_path != _grammar_path:
+        reset(grammar_path)
+    if engine == "textx":
+        warmup()
 
 
+def _parse_chunk(chunk, engine):
+    results = []
+    for s in chunk:
+        try:
+            results.append(parse_program(s, engine=engine))
+        except Exception as e:
+            # textX exceptions do not survive pickling back to the parent
+            message = getattr(e, "message", None) or str(e)
+            if type(message) == bytes:
+                message = message.decode("utf-8")
+            results.append(
+                ParseError(
+                    "%s: %s" % (type(e).__name__, message),
+                    getattr(e, "line", None),
+                    getattr(e, "col", None),
+                )
+            )
+    return results
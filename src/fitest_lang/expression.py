@@ -1,13 +1,71 @@
-import sys
+import operator
 
 from .baseobject import FitestBaseObject, FitestObject
+from .lazy import is_array
+
+_OPS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+}
 
 
 class ExpressionBase(FitestBaseObject, FitestObject):
-    @staticmethod
-    def textx_type_class(textx_type):
-        t = str(textx_type)
-        return getattr(sys.modules[__name__], t[t.find(".") + 1: t.find(" ")])
+    def compile(self):
+        """Return a function of the variable env that evaluates this expression.
+
+        The function is built once per node and cached on it. Variables may be
+        bound to NumPy arrays (e.g. all values of a rep ladder), in which case
+        the function returns an array with one entry per value.
+        """
+        fn = self.__dict__.get("_fn")
+        if fn is None:
+            fn = self._fn = self._compile()
+        return fn
+
+    def _compile(self):
+        raise NotImplementedError
+
+    def variables(self):
+        """Return the set of variable names this expression depends on (cached)."""
+        names = self.__dict__.get("_vars")
+        if names is None:
+            names = self._vars = self._variables()
+        return names
+
+    def _variables(self):
+        return frozenset()
+
+    def __getstate__(self):
+        # compiled closures are neither picklable nor worth copying
+        state = self.__dict__.copy()
+        state.pop("_fn", None)
+        return state
+
+
+def trunc(x):
+    """Truncate toward zero: `int(x)` for scalars, elementwise for arrays."""
+    if is_array(x):
+        return x.astype(int)
+    return int(x)
+
+
+def _compile_ops(left, ops, right):
+    # `left op right[0] op right[1] ...`, evaluated left to right and
+    # truncated to an int when there is at least one op
+    left = left.compile()
+    if not right:
+        return left
+    steps = [(_OPS[op], r.compile()) for op, r in zip(ops, right)]
+
+    def fn(env):
+        x = left(env)
+        for op, r in steps:
+            x = op(x, r(env))
+        return trunc(x)
+
+    return fn
 
 
 class Expression(ExpressionBase):
@@ -15,7 +73,13 @@ class Expression(ExpressionBase):
         self.expr = expr
 
     def eval_exprs(self, env={}):
-        return self.expr.eval_exprs(env=env)
+        return self.compile()(env)
+
+    def _compile(self):
+        return self.expr.compile()
+
+    def _variables(self):
+        return self.expr.variables()
 
     def to_str(self, env={}, eval_exprs=False):
         return self.expr.to_str(env=env, eval_exprs=eval_exprs)
@@ -33,6 +97,10 @@ class Expression(ExpressionBase):
     def from_ir(cls, ir):
         return cls(Sum.from_ir(ir.expr))
 
+    @classmethod
+    def from_dict(cls, ir):
+        return cls(Sum.from_dict(cls.ir_body(ir)))
+
 
 class Sum(ExpressionBase):
     def __init__(self, left, ops, right):
@@ -41,9 +109,17 @@ class Sum(ExpressionBase):
         self.right = right
 
     def eval_exprs(self, env={}):
-        return eval(self.to_str(env=env, eval_exprs=True))
+        return self.compile()(env)
+
+    def _compile(self):
+        return _compile_ops(self.left, self.ops, self.right)
+
+    def _variables(self):
+        return self.left.variables().union(*[r.variables() for r in self.right])
 
     def to_str(self, env={}, eval_exprs=False):
+        if eval_exprs and self.right:
+            return str(self.compile()(env))
         s = self.left.to_str(env=env, eval_exprs=eval_exprs)
         if self.right:
             products = map(
@@ -54,8 +130,6 @@ class Sum(ExpressionBase):
                     + " "
                     + "".join([" ".join(op_prod) for op_prod in zip(self.ops, products)])
             )
-            if eval_exprs:
-                s = str(int(eval(s)))
         return s
 
     def to_ir(self):
@@ -89,6 +163,15 @@ class Sum(ExpressionBase):
             right=[Product.from_ir(r) for r in ir.right],
         )
 
+    @classmethod
+    def from_dict(cls, ir):
+        ir = cls.ir_body(ir)
+        return cls(
+            left=Product.from_dict(ir["left"]),
+            ops=list(ir["ops"]),
+            right=[Product.from_dict(r) for r in ir["right"]],
+        )
+
 
 class Product(ExpressionBase):
     def __init__(self, left, ops, right):
@@ -97,16 +180,22 @@ class Product(ExpressionBase):
         self.right = right
 
     def to_str(self, env={}, eval_exprs=False):
+        if eval_exprs and self.right:
+            return str(self.compile()(env))
         s = self.left.to_str(env=env, eval_exprs=eval_exprs)
         if self.right:
             vals = map(lambda r: r.to_str(env=env, eval_exprs=eval_exprs), self.right)
             s = s + " " + "".join([" ".join(op_val) for op_val in zip(self.ops, vals)])
-            if eval_exprs:
-                s = str(int(eval(s)))
         return s
 
     def eval_exprs(self, env={}):
-        return eval(self.to_str(env=env, eval_exprs=True))
+        return self.compile()(env)
+
+    def _compile(self):
+        return _compile_ops(self.left, self.ops, self.right)
+
+    def _variables(self):
+        return self.left.variables().union(*[r.variables() for r in self.right])
 
     def to_ir(self):
         return {
@@ -139,6 +228,15 @@ class Product(ExpressionBase):
             right=[Value.from_ir(r) for r in ir.right],
         )
 
+    @classmethod
+    def from_dict(cls, ir):
+        ir = cls.ir_body(ir)
+        return cls(
+            left=Value.from_dict(ir["left"]),
+            ops=list(ir["ops"]),
+            right=[Value.from_dict(r) for r in ir["right"]],
+        )
+
 
 class Value(ExpressionBase):
     def __init__(self, val):
@@ -153,12 +251,23 @@ class Value(ExpressionBase):
             return str(self.val)
 
     def eval_exprs(self, env={}):
-        if type(self.val) in [int, float]:
-            return self.val
-        elif type(self.val) == Expression:
-            return self.val.eval_exprs(env=env)
+        return self.compile()(env)
+
+    def _compile(self):
+        val = self.val
+        if type(val) in [int, float]:
+            return lambda env: val
+        elif type(val) == Expression:
+            return val.compile()
         else:
-            return env[self.val]
+            return lambda env: env[val]
+
+    def _variables(self):
+        if type(self.val) == Expression:
+            return self.val.variables()
+        elif type(self.val) == str:
+            return frozenset([self.val])
+        return frozenset()
 
     def to_ir(self):
         if type(self.val) in [int, float, str]:
@@ -180,11 +289,18 @@ class Value(ExpressionBase):
         if type(ir.val) in [int, float]:
             return cls(val=ir.val)
         elif ir.type:
-            t = str(ir.type)
-            return cls(val=t[t.find(":") + 1: -1])
+            return cls(val=ir.type.name)
         else:
             return cls(val=Expression.from_ir(ir.val))
 
+    @classmethod
+    def from_dict(cls, ir):
+        val = cls.ir_body(ir)
+        if type(val) in [int, float, str]:
+            return cls(val=val)
+        else:
+            return cls(val=Expression.from_dict(val))
+
 
 class Variable(ExpressionBase):
     def __init__(self, name, ints):
@@ -212,3 +328,82 @@ class Variable(ExpressionBase):
     @classmethod
     def from_ir(cls, ir):
         return cls(name=ir.name, ints=ir.ints)
+
+    @classmethod
+    def from_dict(cls, ir):
+        ir = cls.ir_body(ir)
+        return cls(name=ir["name"], ints=list(ir["ints"]))
+
+
+# constant folding
+def fold_constants(node):
+    """Replace variable-free subexpressions anywhere under `node` with literals.
+
+    `node` may be any program object, e.g. the result of `Program.from_ir`;
+    it is modified in place. Returns a list of `(expression string, value)`
+    pairs, one per folded subexpression.
+    """
+    folded = []
+    _fold(node, folded)
+    return folded
+
+
+def _fold(node, folded):
+    changed = False
+    for name, child in list(vars(node).items()):
+        if name.startswith("_"):
+            continue
+        if type(child) == list:
+            for i, c in enumerate(child):
+                child[i], c_changed = _fold_child(c, folded)
+                changed = changed or c_changed
+        else:
+            new, c_changed = _fold_child(child, folded)
+            if new is not child:
+                setattr(node, name, new)
+            changed = changed or c_changed
+    if changed:
+        # drop the closure compiled from, and the execution plan of, the
+        # unfolded children
+        node.__dict__.pop("_fn", None)
+        node.__dict__.pop("_plan", None)
+    return changed
+
+
+def _fold_child(node, folded):
+    if not isinstance(node, FitestBaseObject):
+        return node, False
+    if (
+        isinstance(node, ExpressionBase)
+        and type(node) != Variable
+        and not node.variables()
+        and not _is_literal(node)
+    ):
+        try:
+            value = node.eval_exprs()
+        except ArithmeticError:
+            # e.g. a division by zero: left to fail when the program is
+            # evaluated, as it would unfolded; its parts may still fold
+            return node, _fold(node, folded)
+        folded.append((str(node), value))
+        return _literal(type(node), value), True
+    return node, _fold(node, folded)
+
+
+def _is_literal(node):
+    if type(node) == Value:
+        return type(node.val) in [int, float]
+    elif type(node) == Expression:
+        return _is_literal(node.expr)
+    return not node.right and _is_literal(node.left)
+
+
+def _literal(cls, value):
+    # a literal of the same node type, so parents and `to_ir` stay well-formed
+    if cls == Value:
+        return Value(value)
+    elif cls == Product:
+        return Product(Value(value), [], [])
+    elif cls == Sum:
+        return Sum(_literal(Product, value), [], [])
+    return Expression(_literal(Sum, value))
@@ -0,0 +1,588 @@
+"""Hand-written parser for the grammar in `config/dsl.tx`.
+
+Each rule of the grammar is transliterated into a method below with the same
+PEG semantics textX/Arpeggio use: ordered choice commits to the first
+alternative that matches, repetitions are greedy, string matches are plain
+prefix matches and whitespace is skipped before every terminal. The result is
+a tree of `Node` objects with the same class names and attributes as the
+textX model, so `Program.from_ir` consumes either one.
+"""
+import re
+
+_WS = " \t\n\r"
+
+# textX base types
+_ID = re.compile(r"[^\d\W]\w*\b", re.MULTILINE)
+_INT = re.compile(r"[-+]?[0-9]+\b", re.MULTILINE)
+_FLOAT = re.compile(
+    r"[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?(?<=[\w\.])(?![\w\.])", re.MULTILINE
+)
+
+_CLEAN = re.compile(r"clean(_and_jerk)?", re.MULTILINE)
+_SUMODEADLIFT = re.compile(r"sumodeadlift(_highpull)?", re.MULTILINE)
+_BURPEE = re.compile(r"burpee(_pullup)?", re.MULTILINE)
+
+_TIME_UNITS = ("sec", "min", "hr")
+_WORK_UNITS = ("cal", "J")
+_LENGTH_UNITS = ("meter", "km", "mile", "ft", "inch")
+_WEIGHT_UNITS = ("lb", "pound", "kg", "kilogram")
+_REPETITION_UNITS = ("rounds", "cycles", "reps")
+
+_ENDURANCE_TYPES = ("run", "swim", "bike", "ski", "airbike", "row")
+_GYMNASTIC_TYPES = (
+    "pushup", "pullup", _BURPEE, "situp", "ghd_situp", "knee_to_elbow",
+    "toe_to_bar", "back_extension", "hip_extension", "dip", "muscle_up",
+    "pistol", "squat", "handstand_pushup", "double_under",
+)
+_OBJECT_TYPES = (
+    # (objects, movement types) for each ObjectMovementType alternative;
+    # the wallball alternative takes a height instead of an object
+    (
+        ("barbell", "dumbells", "dumbell", "kettlebells", "kettlebell"),
+        (_CLEAN, "front_squat", "deadlift", _SUMODEADLIFT, "push_press",
+         "push_jerk", "split_jerk", "shoulder_to_overhead",
+         "ground_to_overhead", "hang_clean", "thruster"),
+    ),
+    (("barbell",), ("back_squat",)),
+    (("barbell", "dumbell", "kettlebell"), ("snatch", "overhead_squat")),
+    (("barbell", "dumbells", "kettlebells"), ("bench_press",)),
+    (("kettlebell", "dumbbell"), ("swing",)),
+)
+
+
+class Node:
+    """Model object with the attributes textX would give the same rule."""
+
+    def __init__(self, **attrs):
+        self.__dict__.update(attrs)
+
+    def __str__(self):
+        return "<fast:dsl.%s instance at %s>" % (type(self).__name__, hex(id(self)))
+
+    __repr__ = __str__
+
+
+class TaskPriority(Node):
+    pass
+
+
+class TaskPriorityBase(Node):
+    pass
+
+
+class TimeCappedTask(Node):
+    pass
+
+
+class TimePriority(Node):
+    pass
+
+
+class TimePriorityBase(Node):
+    pass
+
+
+class MovementSeq(Node):
+    pass
+
+
+class Rest(Node):
+    pass
+
+
+class EnduranceMovement(Node):
+    pass
+
+
+class EnduranceMovementType(Node):
+    pass
+
+
+class ObjectMovement(Node):
+    pass
+
+
+class ObjectMovementType(Node):
+    pass
+
+
+class GymnasticMovement(Node):
+    pass
+
+
+class GymnasticMovementType(Node):
+    pass
+
+
+class Time(Node):
+    pass
+
+
+class Work(Node):
+    pass
+
+
+class Length(Node):
+    pass
+
+
+class Weight(Node):
+    pass
+
+
+class Repetition(Node):
+    pass
+
+
+class Expression(Node):
+    pass
+
+
+class Sum(Node):
+    pass
+
+
+class Product(Node):
+    pass
+
+
+class Value(Node):
+    pass
+
+
+class Variable(Node):
+    def __str__(self):
+        return "<Variable:%s>" % self.name
+
+    __repr__ = __str__
+
+
+class _Parser:
+    def __init__(self, s):
+        self.s = s
+        self.n = len(s)
+        self.furthest = 0
+        self.memo = {}
+
+    # terminals: return the end position of the match, or -1
+    def ws(self, pos):
+        s, n = self.s, self.n
+        while pos < n and s[pos] in _WS:
+            pos += 1
+        return pos
+
+    def fail(self, pos):
+        if pos > self.furthest:
+            self.furthest = pos
+        return -1
+
+    def lit(self, pos, lit):
+        pos = self.ws(pos)
+        if self.s.startswith(lit, pos):
+            return pos + len(lit)
+        return self.fail(pos)
+
+    def match(self, pos, options):
+        """Ordered choice of string/regex matches; returns (text, end) or None."""
+        pos = self.ws(pos)
+        s = self.s
+        for option in options:
+            if type(option) == str:
+                if s.startswith(option, pos):
+                    return option, pos + len(option)
+            else:
+                m = option.match(s, pos)
+                if m:
+                    return m.group(), m.end()
+        self.fail(pos)
+        return None
+
+    # program
+    def program(self):
+        for rule in (
+            self.time_priority,
+            self.time_priority_base,
+            self.task_priority,
+            self.task_priority_base,
+            self.time_capped_task,
+            self.movement_seq,
+        ):
+            r = rule(0)
+            if r:
+                break
+        else:
+            self.syntax_error()
+        program, pos = r
+        pos = self.ws(pos)
+        if pos != self.n:
+            self.fail(pos)
+            self.syntax_error()
+        return program
+
+    def blocks(self, pos, alternatives, head_attr):
+        """`(head ':' seq ';' rest=Rest?)+` shared by all program types."""
+        heads, seqs, rests = [], [], []
+        while True:
+            for keyword, head_rule, seq_rule in alternatives:
+                p = pos
+                if keyword:
+                    p = self.lit(p, keyword)
+                    if p < 0:
+                        continue
+                r = head_rule(p)
+                if not r:
+                    continue
+                head, p = r
+                p = self.lit(p, ":")
+                if p < 0:
+                    continue
+                r = seq_rule(p)
+                if not r:
+                    continue
+                seq, p = r
+                p = self.lit(p, ";")
+                if p < 0:
+                    continue
+                r = self.rest(p)
+                if r:
+                    rests.append(r[0])
+                    p = r[1]
+                heads.append(head)
+                seqs.append(seq)
+                pos = p
+                break
+            else:
+                break
+        if not heads:
+            return None
+        return {head_attr: heads, "seq": seqs, "rest": rests}, pos
+
+    def memoized(self, rule, pos):
+        # nested program types and sequences are retried by every enclosing
+        # alternative, so remember their results per position
+        key = (rule, pos)
+        if key not in self.memo:
+            self.memo[key] = rule(pos)
+        return self.memo[key]
+
+    def task_priority(self, pos):
+        r = self.blocks(
+            pos,
+            (
+                (None, self.repetition, self.time_priority_base),
+                (None, self.repetition, self.time_capped_task),
+                ("for", self.variable, self.time_priority_base),
+                ("for", self.variable, self.time_capped_task),
+            ),
+            "reps",
+        )
+        return r and (TaskPriority(**r[0]), r[1])
+
+    def task_priority_base(self, pos):
+        return self.memoized(self._task_priority_base, pos)
+
+    def _task_priority_base(self, pos):
+        r = self.blocks(
+            pos,
+            (
+                (None, self.repetition, self.movement_seq),
+                ("for", self.variable, self.movement_seq),
+            ),
+            "reps",
+        )
+        return r and (TaskPriorityBase(**r[0]), r[1])
+
+    def time_capped_task(self, pos):
+        return self.memoized(self._time_capped_task, pos)
+
+    def _time_capped_task(self, pos):
+        r = self.blocks(
+            pos,
+            (
+                ("in", self.time, self.movement_seq),
+                ("in", self.time, self.task_priority_base),
+            ),
+            "time",
+        )
+        return r and (TimeCappedTask(**r[0]), r[1])
+
+    def time_priority(self, pos):
+        r = self.blocks(pos, (("AMRAP", self.time, self.task_priority_base),), "time")
+        return r and (TimePriority(**r[0]), r[1])
+
+    def time_priority_base(self, pos):
+        return self.memoized(self._time_priority_base, pos)
+
+    def _time_priority_base(self, pos):
+        r = self.blocks(pos, (("AMRAP", self.time, self.movement_seq),), "time")
+        return r and (TimePriorityBase(**r[0]), r[1])
+
+    # movement sequences
+    def movement_seq(self, pos):
+        return self.memoized(self._movement_seq, pos)
+
+    def _movement_seq(self, pos):
+        movements, rests = [], []
+        while True:
+            r = self.movement(pos)
+            if not r:
+                break
+            movements.append(r[0])
+            pos = r[1]
+            r = self.rest(pos)
+            if r:
+                rests.append(r[0])
+                pos = r[1]
+        if not movements:
+            return None
+        return MovementSeq(movements=movements, rest=rests), pos
+
+    def movement(self, pos):
+        return (
+            self.endurance_movement(pos)
+            or self.object_movement(pos)
+            or self.gymnastic_movement(pos)
+        )
+
+    def variable(self, pos):
+        m = self.match(pos, (_ID,))
+        if not m:
+            return None
+        name, pos = m
+        pos = self.lit(pos, "in")
+        if pos < 0:
+            return None
+        ints = []
+        while True:
+            m = self.match(pos, (_INT,))
+            if not m:
+                break
+            ints.append(int(m[0]))
+            pos = m[1]
+        if not ints:
+            return None
+        return Variable(name=name, ints=ints), pos
+
+    def rest(self, pos):
+        r = self.time(pos)
+        if not r:
+            return None
+        p = self.lit(r[1], "rest")
+        if p < 0:
+            return None
+        return Rest(magnitude=r[0]), p
+
+    # endurance
+    def endurance_movement(self, pos):
+        for magnitude_rule in (self.time, self.length, self.work):
+            r = magnitude_rule(pos)
+            if not r:
+                continue
+            m = self.match(r[1], _ENDURANCE_TYPES)
+            if m:
+                mvmt_type = EnduranceMovementType(mvmt_type=m[0])
+                return EnduranceMovement(magnitude=r[0], mvmt_type=mvmt_type), m[1]
+        return None
+
+    # object
+    def object_movement(self, pos):
+        for magnitude_rule in (self.value, self.time):
+            r = magnitude_rule(pos)
+            if not r:
+                continue
+            t = self.object_movement_type(r[1])
+            if t:
+                return ObjectMovement(magnitude=r[0], mvmt_type=t[0]), t[1]
+        return None
+
+    def object_movement_type(self, pos):
+        for objs, mvmt_types in _OBJECT_TYPES:
+            r = self.weight(pos)
+            if not r:
+                return None
+            o = self.match(r[1], objs)
+            if not o:
+                continue
+            m = self.match(o[1], mvmt_types)
+            if not m:
+                continue
+            return (
+                ObjectMovementType(weight=r[0], obj=o[0], mvmt_type=m[0], height=None),
+                m[1],
+            )
+        r = self.weight(pos)
+        h = r and self.length(r[1])
+        if not h:
+            return None
+        p = self.lit(h[1], "wallball")
+        if p < 0:
+            return None
+        return (
+            ObjectMovementType(weight=r[0], obj="", mvmt_type="wallball", height=h[0]),
+            p,
+        )
+
+    # gymnastic
+    def gymnastic_movement(self, pos):
+        for magnitude_rule in (self.length, self.time):
+            r = magnitude_rule(pos)
+            if r:
+                p = self.lit(r[1], "handstand_walk")
+                if p >= 0:
+                    return GymnasticMovement(magnitude=r[0], mvmt_type="handstand_walk"), p
+        for magnitude_rule in (self.time, self.value):
+            r = magnitude_rule(pos)
+            if not r:
+                continue
+            t = self.gymnastic_movement_type(r[1])
+            if t:
+                return GymnasticMovement(magnitude=r[0], mvmt_type=t[0]), t[1]
+        return None
+
+    def gymnastic_movement_type(self, pos):
+        m = self.match(pos, _GYMNASTIC_TYPES)
+        if m:
+            return GymnasticMovementType(mvmt_type=m[0], height=None), m[1]
+        r = self.length(pos)
+        if not r:
+            return None
+        p = self.lit(r[1], "box_jump")
+        if p < 0:
+            return None
+        return GymnasticMovementType(mvmt_type="box_jump", height=r[0]), p
+
+    # physical quantities
+    def quantity(self, pos, cls, units):
+        key = (cls, pos)
+        if key in self.memo:
+            return self.memo[key]
+        result = None
+        r = self.value(pos)
+        if r:
+            u = self.match(r[1], units)
+            if u:
+                result = cls(magnitude=r[0], units=u[0]), u[1]
+        self.memo[key] = result
+        return result
+
+    def time(self, pos):
+        return self.quantity(pos, Time, _TIME_UNITS)
+
+    def work(self, pos):
+        return self.quantity(pos, Work, _WORK_UNITS)
+
+    def length(self, pos):
+        return self.quantity(pos, Length, _LENGTH_UNITS)
+
+    def weight(self, pos):
+        return self.quantity(pos, Weight, _WEIGHT_UNITS)
+
+    def repetition(self, pos):
+        return self.quantity(pos, Repetition, _REPETITION_UNITS)
+
+    # expressions
+    def expression(self, pos):
+        r = self.sum(pos)
+        return r and (Expression(expr=r[0]), r[1])
+
+    def sum(self, pos):
+        return self.operation(pos, Sum, self.product, ("+", "-"))
+
+    def product(self, pos):
+        return self.operation(pos, Product, self.value, ("*", "/"))
+
+    def operation(self, pos, cls, operand, ops):
+        r = operand(pos)
+        if not r:
+            return None
+        left, pos = r
+        op, right = [], []
+        while True:
+            o = self.match(pos, ops)
+            r = o and operand(o[1])
+            if not r:
+                break
+            op.append(o[0])
+            right.append(r[0])
+            pos = r[1]
+        return cls(left=left, op=op, right=right), pos
+
+    def value(self, pos):
+        key = (Value, pos)
+        if key in self.memo:
+            return self.memo[key]
+        result = None
+        m = self.match(pos, (_INT,))
+        if m:
+            result = Value(val=int(m[0]), type=None), m[1]
+        else:
+            m = self.match(pos, (_FLOAT,))
+            if m:
+                result = Value(val=float(m[0]), type=None), m[1]
+            else:
+                m = self.match(pos, (_ID,))
+                if m:
+                    result = Value(val=None, type=m[0]), m[1]
+                else:
+                    p = self.lit(pos, "(")
+                    r = self.expression(p) if p >= 0 else None
+                    if r:
+                        p = self.lit(r[1], ")")
+                        if p >= 0:
+                            result = Value(val=r[0], type=None), p
+        self.memo[key] = result
+        return result
+
+    # errors
+    def syntax_error(self):
+        # textX is only imported for its exception types, when one is raised
+        from textx.exceptions import TextXSyntaxError
+
+        line, col = self.linecol(self.furthest)
+        raise TextXSyntaxError(
+            "Unexpected input at position (%d, %d) => '%s*%s'."
+            % (line, col, self.s[max(0, self.furthest - 10): self.furthest],
+               self.s[self.furthest: self.furthest + 10]),
+            line,
+            col,
+        )
+
+    def linecol(self, pos):
+        line = self.s.count("\n", 0, pos) + 1
+        return line, pos - (self.s.rfind("\n", 0, pos) + 1) + 1
+
+
+def _semantic_error(message):
+    from textx.exceptions import TextXSemanticError
+
+    raise TextXSemanticError(message)
+
+
+def _collect(node, variables, values):
+    if type(node) == Variable:
+        variables.setdefault(node.name, []).append(node)
+    elif type(node) == Value:
+        values.append(node)
+    if isinstance(node, Node):
+        for attr in node.__dict__.values():
+            if type(attr) == list:
+                for a in attr:
+                    _collect(a, variables, values)
+            else:
+                _collect(attr, variables, values)
+
+
+def parse(s):
+    """Parse `s` into a model equivalent to `dsl.parse(s)` with textX."""
+    program = _Parser(s).program()
+    # resolve `type=[Variable]` references like textX does after parsing
+    variables, values = {}, []
+    _collect(program, variables, values)
+    for value in values:
+        if type(value.type) == str:
+            if value.type not in variables:
+                _semantic_error('Unknown object "%s" of class "Variable"' % value.type)
+            if len(variables[value.type]) > 1:
+                _semantic_error("name %s is not unique." % value.type)
+            value.type = variables[value.type][0]
+    return program
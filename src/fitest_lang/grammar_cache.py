@@ -0,0 +1,173 @@
+import hashlib
+import marshal
+import os
+from pathlib import Path
+
+# bump whenever the on-disk encoding below changes
+ARTIFACT_VERSION = 2
+ARTIFACT_SUFFIX = ".grammar"
+CACHE_DIR_ENV = "FITEST_LANG_CACHE_DIR"
+
+
+# The artifact stores the textX parse tree of the grammar file, i.e. the
+# output of the expensive step of `textx.metamodel_from_file`. Parse tree
+# nodes refer to rules of textX's own grammar parser by their position in
+# that parser's model, so an artifact is only valid for the textX/Arpeggio
+# versions it was written with; both are part of the file name and are
+# checked again when the artifact is loaded.
+def default_cache_dir():
+    cache_dir = os.environ.get(CACHE_DIR_ENV)
+    if cache_dir:
+        return Path(cache_dir)
+    return Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "fitest_lang"
+
+
+class ArtifactVersionError(ValueError):
+    """An artifact written by another artifact, textX or Arpeggio version."""
+
+
+def _versions():
+    import importlib.metadata
+
+    return (
+        ARTIFACT_VERSION,
+        importlib.metadata.version("textX"),
+        importlib.metadata.version("Arpeggio"),
+    )
+
+
+def artifact_name(grammar):
+    key = "\0".join([grammar] + [str(v) for v in _versions()])
+    return "dsl-" + hashlib.sha256(key.encode("utf-8")).hexdigest()[:16] + ARTIFACT_SUFFIX
+
+
+def artifact_path(grammar, cache_dir=None):
+    return Path(cache_dir or default_cache_dir()) / artifact_name(grammar)
+
+
+def compile_artifact(grammar):
+    """Parse `grammar` with textX's grammar parser and encode the parse tree."""
+    from arpeggio import Terminal
+
+    parser = _grammar_parser()
+    rule_index = {id(r): i for i, r in enumerate(_grammar_rules(parser))}
+
+    def encode(node):
+        i = rule_index.get(id(node.rule), -1)
+        if isinstance(node, Terminal):
+            return (i, node.position, node.value, node.suppress)
+        return (i, [encode(n) for n in node])
+
+    return marshal.dumps((_versions(), encode(parser.parse(grammar))))
+
+
+def write_artifact(grammar, cache_dir=None, artifact=None):
+    """Write the artifact for `grammar` (compiling it unless given), returning its path."""
+    if artifact is None:
+        artifact = compile_artifact(grammar)
+    path = artifact_path(grammar, cache_dir=cache_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".%d.tmp" % os.getpid())
+    tmp.write_bytes(artifact)
+    os.replace(tmp, path)
+    return path
+
+
+def read_artifact(grammar, cache_dir=None):
+    """Return the artifact bytes for `grammar`, or None if not cached."""
+    try:
+        return artifact_path(grammar, cache_dir=cache_dir).read_bytes()
+    except OSError:
+        return None
+
+
+def metamodel_from_artifact(artifact, file_name=None):
+    """Build a textX metamodel from an artifact without reparsing the grammar.
+
+    Mirrors `textx.metamodel_from_file` from the point where the grammar
+    parse tree is available. Raises `ArtifactVersionError` for an artifact of
+    other versions and ValueError (or EOFError) for a corrupt one.
+    """
+    from arpeggio import EndOfFile, NonTerminal, RegExMatch, Terminal
+    from arpeggio import visit_parse_tree
+    from textx.lang import TextXVisitor
+    from textx.metamodel import TextXMetaModel
+
+    parser = _grammar_parser()
+    rules = _grammar_rules(parser)
+    eof = EndOfFile()
+
+    def decode(t):
+        rule = rules[t[0]] if t[0] >= 0 else eof
+        if len(t) == 4:
+            extra_info = rule.regex.match(t[2]) if isinstance(rule, RegExMatch) else None
+            return Terminal(rule, t[1], t[2], suppress=t[3], extra_info=extra_info)
+        return NonTerminal(rule, [decode(n) for n in t[1]])
+
+    versions, tree = marshal.loads(artifact)
+    if tuple(versions) != _versions():
+        raise ArtifactVersionError("grammar artifact written by: %r" % (versions,))
+    try:
+        tree = decode(tree)
+    except (IndexError, TypeError) as e:
+        raise ValueError("corrupt grammar artifact") from e
+    metamodel = TextXMetaModel(file_name=file_name)
+    lang_parser = visit_parse_tree(tree, TextXVisitor(parser, metamodel))
+    metamodel.validate()
+    lang_parser.metamodel = metamodel
+    metamodel._parser_blueprint = lang_parser
+    metamodel.validate_user_classes()
+    return metamodel
+
+
+def _grammar_parser():
+    # textX and Arpeggio are imported here, when a grammar is compiled, not
+    # when the package is
+    from arpeggio import ParserPython
+    from textx.lang import comment, textX_parsers, textx_model
+
+    # same parser instance textX itself caches for non-debug metamodels
+    parser = textX_parsers.get(False)
+    if parser is None:
+        parser = ParserPython(
+            textx_model,
+            comment_def=comment,
+            ignore_case=False,
+            reduce_tree=False,
+            memoization=False,
+            debug=False,
+        )
+        textX_parsers[False] = parser
+    return parser
+
+
+def _grammar_rules(parser):
+    rules, seen, stack = [], set(), [parser.comments_model, parser.parser_model]
+    while stack:
+        rule = stack.pop()
+        if rule is None or id(rule) in seen:
+            continue
+        seen.add(id(rule))
+        rules.append(rule)
+        stack.extend(reversed(rule.nodes))
+    return rules
+
+
+if __name__ == "__main__":
+    import argparse
+    from importlib.resources import files
+
+    from . import config
+
+    arg_parser = argparse.ArgumentParser(
+        description="Precompile the fitest_lang grammar into the on-disk cache."
+    )
+    arg_parser.add_argument("--grammar", help="grammar file (default: packaged dsl.tx)")
+    arg_parser.add_argument("--cache-dir", help="output directory (default: %(default)s)",
+                            default=default_cache_dir())
+    args = arg_parser.parse_args()
+    if args.grammar:
+        grammar = Path(args.grammar).read_text(encoding="utf-8")
+    else:
+        grammar = files(config).joinpath("dsl.tx").read_text(encoding="utf-8")
+    print(write_artifact(grammar, cache_dir=args.cache_dir))
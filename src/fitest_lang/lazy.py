@@ -0,0 +1,30 @@
+import importlib.util
+import sys
+
+
+# numpy (and with it pint and pandas) dominates the import time of the
+# package, while parsing and building programs never needs it
+def lazy_import(name):
+    """Module `name`, executed on first attribute access instead of now.
+
+    Follows the `importlib.util.LazyLoader` recipe; a module that is
+    already imported is returned as is.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError("No module named %r" % (name,), name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def is_array(x):
+    """`type(x) == np.ndarray`, without loading numpy to find out."""
+    t = type(x)
+    return t.__name__ == "ndarray" and t.__module__ == "numpy"
@@ -1,36 +1,31 @@
 import datetime
 import itertools as it
 import re 
-import sys
 from types import FunctionType
 
-import numpy as np
-
 from .baseobject import FitestObject, FitestBaseObject
-from .expression import Value, Variable
-from .quantity import Quantity, Work, Time, Weight, Length, Repetition
+from .expression import Value, Variable, trunc
+from .quantity import Quantity, Work, Time, Weight, Length, Repetition, default_measure
 from .timer import Timers, Timer, Stopwatch
+from .power import joules, seconds
+from .lazy import is_array, lazy_import
+
+np = lazy_import("numpy")
 
 
 class MovementBase(FitestBaseObject, FitestObject):
-    @staticmethod
-    def textx_type_class(textx_type):
-        t = str(textx_type)
-        if 'Value' in t:
-            return Value
-        elif 'Variable' in t:
-            return Variable
-        elif 'Work' in t:
-            return Work
-        elif 'Time' in t:
-            return Time
-        elif 'Weight' in t:
-            return Weight
-        elif 'Length' in t:
-            return Length
-        else:
-            t = t[t.find(".") + 1: t.find(" ")]
-            return getattr(sys.modules[__name__], t)
+    pass
+
+
+# Work of a movement done for time is a function of the athlete's score:
+# reps for object and gymnastic movements, the distance covered for
+# endurance movements, and the time taken for swims and bike rides over a
+# distance. Scores may be plain numbers (distances in meters, times in
+# seconds) or arrays of them, e.g. one per leaderboard entry.
+def _magnitude(x, env={}):
+    if (type(x) in [int, float] or is_array(x)):
+        return x
+    return x.eval_exprs(env=env)
 
 
 class Rest(MovementBase):
@@ -40,10 +35,14 @@ class Rest(MovementBase):
     def get_time(self, env={}):
         return self.magnitude.eval_exprs(env=env)
 
-    def get_reps(self, rep_len=Quantity(15, "sec"), env={}):
-        return int(
-            Quantity(self.magnitude.magnitude.eval_exprs(env=env), self.magnitude.units)
-            / rep_len
+    def get_reps(self, rep_len=None, env={}):
+        if rep_len is None:
+            rep_len = Quantity(15, "sec")
+        return trunc(
+            (
+                Quantity(self.magnitude.magnitude.eval_exprs(env=env), self.magnitude.units)
+                / rep_len
+            ).m_as("dimensionless")
         )
 
     def to_ir(self):
@@ -59,8 +58,15 @@ class Rest(MovementBase):
     def from_ir(cls, ir):
         return cls(cls.textx_type_class(ir.magnitude).from_ir(ir.magnitude))
 
+    @classmethod
+    def from_dict(cls, ir):
+        ir = cls.ir_body(ir)
+        return cls(cls.ir_type_class(ir).from_dict(ir))
+
 
 class MovementSeq(MovementBase):
+    top_sections = ("timer_objs", "str", "ir")
+
     def __init__(self, movements, rest=None):
         self.movements = movements
         self.rest = rest
@@ -124,7 +130,28 @@ class MovementSeq(MovementBase):
         else:
             return sum(mvmt_works).to(work_units)
 
+    def get_work_cohort(self, cohort, work_units="cal"):
+        return cohort.work_array(self.get_work(cohort, work_units=work_units), work_units)
+
+    def get_power(self, athlete, score, power_units="watt"):
+        """Average power when finishing in `score`, a time (numbers are
+        seconds). For movements done for time, `score` instead holds one
+        score per movement, and the time is the seq's own."""
+        work = self.get_work(athlete)
+        if type(work) == FunctionType:
+            work, score = work(score), self.get_time()
+        return Quantity(joules(work, athlete) / seconds(score), "watt").to(power_units)
+
+    def get_rep_table(self, athlete, env={}):
+        """(reps, work) of each movement, for the work of partial rounds."""
+        return [(m.get_reps(env=env), m.get_work(athlete, env=env)) for m in self.movements]
+
     def describe(self, env={}, by="mvmt_category"):
+        return self.describe_rounds(1, env=env, by=by)[0]
+
+    def describe_rounds(self, num_rds, env={}, by="mvmt_category"):
+        """Describe `num_rds` rounds at once, `env` binding each variable to
+        an array of its per-round values (or to a single value)."""
         d = {}
         for m in self.to_list():
             # get key
@@ -146,8 +173,18 @@ class MovementSeq(MovementBase):
                 d[key] = val
             else:
                 d[key] = d[key] + val
-        total = np.sum(list(d.values()))
-        return {k: round(v / total, 3) for k, v in d.items()}
+        vals = list(d.values())
+        if any([is_array(v) for v in vals]):
+            vals = np.broadcast_arrays(*vals)
+        total = np.sum(vals, axis=0)
+        shares = {k: v / total for k, v in zip(d.keys(), vals)}
+        return [
+            {
+                k: round(share[j] if is_array(share) else share, 3)
+                for k, share in shares.items()
+            }
+            for j in range(num_rds)
+        ]
 
     def mvmt_reps_list(self):
         return [m.magnitude for m in self.movements]
@@ -165,26 +202,26 @@ class MovementSeq(MovementBase):
             return self.movements
 
     def to_timer_objs(self, env={}, eval_exprs=False):
-        timer_objs = [] 
+        return Timers(list(self.iter_timers(env=env, eval_exprs=eval_exprs)))
+
+    def iter_timers(self, env={}, eval_exprs=False):
+        """Timers of the seq in order, built as they are consumed."""
         if len(self.rest) > 1:
             for (mvmt, rest) in it.zip_longest(self.movements, self.rest):
-                if type(mvmt.magnitude) != Time:
-                    timer_objs += [Stopwatch(mvmt.to_str(env=env, eval_exprs=eval_exprs))]
-                else:
-                    timer_objs += [Timer(datetime.timedelta(**mvmt.magnitude.to_dict()), 
-                                         mvmt.to_str(env=env, eval_exprs=eval_exprs))]
+                yield self._mvmt_timer(mvmt, env, eval_exprs)
                 if rest:
-                    timer_objs += [Timer(datetime.timedelta(**rest.magnitude.to_dict()), 'rest')]
+                    yield Timer(datetime.timedelta(**rest.magnitude.to_dict()), 'rest')
         else:
             for mvmt in self.movements:
-                if type(mvmt.magnitude) != Time:
-                    timer_objs += [Stopwatch(mvmt.to_str(env=env, eval_exprs=eval_exprs))]
-                else:
-                    timer_objs += [Timer(datetime.timedelta(**mvmt.magnitude.to_dict()), 
-                                         mvmt.to_str(env=env, eval_exprs=eval_exprs))]
-            if self.rest and include_rest:
-                timer_objs += [Timer(datetime.timedelta(**rest.magnitude.to_dict()), 'rest')]
-        return Timers(timer_objs)
+                yield self._mvmt_timer(mvmt, env, eval_exprs)
+            if self.rest:
+                yield Timer(datetime.timedelta(**self.rest[0].magnitude.to_dict(env=env)), 'rest')
+
+    def _mvmt_timer(self, mvmt, env, eval_exprs):
+        if type(mvmt.magnitude) != Time:
+            return Stopwatch(mvmt.to_str(env=env, eval_exprs=eval_exprs))
+        return Timer(datetime.timedelta(**mvmt.magnitude.to_dict()), 
+                     mvmt.to_str(env=env, eval_exprs=eval_exprs))
 
     def to_str(self, include_rest=True, env={}, eval_exprs=False):
         s = ""
@@ -209,22 +246,15 @@ class MovementSeq(MovementBase):
                 )
         return s
 
-    def to_ir(self, top=False):
-        ir = {
+    def to_ir(self, top=False, sections=None):
+        if top:
+            return self.top_ir(sections)
+        return {
             "MovementSeq": {
                 "rest": [r.to_ir() for r in self.rest],
                 "movements": [m.to_ir() for m in self.movements],
             }
         }
-        if top:
-            return {
-                "type": "MovementSeq",
-                "timer_objs": self.to_timer_objs().to_json(),
-                "str": self.__str__(),
-                "ir": ir,
-            }
-        else:
-            return ir
 
     def __str__(self):
         return self.to_str()
@@ -241,6 +271,14 @@ class MovementSeq(MovementBase):
             rest=[cls.textx_type_class(r).from_ir(r) for r in ir.rest],
         )
 
+    @classmethod
+    def from_dict(cls, ir):
+        ir = cls.ir_body(ir)
+        return cls(
+            movements=[cls.ir_type_class(m).from_dict(m) for m in ir["movements"]],
+            rest=[cls.ir_type_class(r).from_dict(r) for r in ir["rest"]],
+        )
+
 
 class Movement(MovementBase):
     def get_mvmt_category(self):
@@ -261,15 +299,19 @@ class EnduranceMovement(Movement):
         else:
             return Time()
 
-    def get_reps(
-        self, env={}, len_rep=Quantity(25, "meter"), work_rep=Quantity(1, "cal")
-    ):
+    def get_reps(self, env={}, len_rep=None, work_rep=None):
+        if len_rep is None:
+            len_rep = Quantity(25, "meter")
+        if work_rep is None:
+            work_rep = Quantity(1, "cal")
         if type(self.magnitude) != Time:
             m = self.magnitude.eval_exprs(env=env)
             if type(m) == Length:
-                return int(Quantity(m.magnitude, m.units).to("meter") / len_rep)
+                q = Quantity(m.magnitude, m.units).to("meter") / len_rep
+                return trunc(q.m_as("dimensionless"))
             elif type(m) == Work:
-                return int(Quantity(m.magnitude, m.units).to("cal") / work_rep)
+                q = Quantity(m.magnitude, m.units).to("cal") / work_rep
+                return trunc(q.m_as("dimensionless"))
             else:
                 return m
         else:
@@ -289,67 +331,66 @@ class EnduranceMovement(Movement):
         m = self.magnitude.eval_exprs(env=env)
         return Quantity(m.magnitude, m.units)
 
-    def get_work(self, athlete, env={}):
-        magnitude = self.magnitude.eval_exprs(env=env)
-        # print('magnitude of type: ' + str(type(magnitude)))
+    def get_work(self, athlete, env={}, measure=None):
+        m = measure or default_measure()
+        magnitude = _magnitude(self.magnitude, env=env)
         if type(magnitude) == Work:
-            return magnitude
+            return m.work(m.of(magnitude))
         elif type(magnitude) == Time:
 
             def work_fcn(score):
+                if (type(score) in [int, float] or is_array(score)):
+                    score = Length(score, "meter")
                 if self.mvmt_type in ["swim", "bike"]:
                     return EnduranceMovement(score, self.mvmt_type).get_work(
-                        athlete, env=env
+                        athlete, env=env, measure=m
                     )(magnitude)
                 else:
                     return EnduranceMovement(score, self.mvmt_type).get_work(
-                        athlete, env=env
+                        athlete, env=env, measure=m
                     )
 
             return work_fcn
         elif type(magnitude) == Length:
+            distance = m.of(magnitude)
             if self.mvmt_type == "run":
-                return Quantity(
-                    (
+                return m.work(
+                    m(
                         0.45
-                        * athlete.get_weight(as_force=False).to("kg")
-                        * magnitude.to_quantity().to("km")
-                    ).magnitude,
-                    "cal",
+                        * m.magnitude_in(m.athlete(athlete).mass, "kg")
+                        * m.magnitude_in(distance, "km"),
+                        "cal",
+                    )
                 )
             elif self.mvmt_type == "swim":
 
                 def work_fcn(time):
-                    q = Quantity(
-                        0.55
-                        * (
-                            (magnitude.to_quantity() / time.to_quantity().to("sec")).to(
-                                "feet / sec"
-                            )
-                            ** 2
-                        ).magnitude,
-                        "force_pound",
-                    ) * magnitude.to_quantity().to("ft")
-                    return q
+                    if (type(time) in [int, float] or is_array(time)):
+                        time = Time(time, "sec")
+                    v = distance / m.of(time)
+                    force = m(0.55 * m.magnitude_in(v, "feet / sec") ** 2, "force_pound")
+                    return m.work(force * distance)
 
                 return work_fcn
             elif self.mvmt_type == "bike":
 
                 def work_fcn(time):
-                    g = Quantity(9.88, "m / s**2")
-                    m = athlete.get_weight(as_force=False)
-                    t = time.to_quantity().to("sec")
-                    air_density = Quantity(1.225, "kg / m**3")
-                    athlete_cross_sectional_area = Quantity(0.075, "m**2")
-                    v = magnitude.to_quantity().to("meter") / t
+                    if (type(time) in [int, float] or is_array(time)):
+                        time = Time(time, "sec")
+                    g = m(9.88, "m / s**2")
+                    mass = m.athlete(athlete).mass
+                    t = m.of(time)
+                    air_density = m(1.225, "kg / m**3")
+                    athlete_cross_sectional_area = m(0.075, "m**2")
+                    v = distance / t
                     fric_coeff_air = 1
                     fric_coeff_road = 0.005
                     work = (
                         (0.5 * air_density * athlete_cross_sectional_area * v ** 3 * t)
-                        + (v * m * g * fric_coeff_road * t)
-                        + (v * m * v)
+                        + (v * mass * g * fric_coeff_road * t)
+                        + (v * mass * v)
                     )
-                    return work
+                    return m.work(work)
 
                 return work_fcn
             else:
@@ -405,6 +446,14 @@ class EnduranceMovement(Movement):
             mvmt_type=ir.mvmt_type.mvmt_type,
         )
 
+    @classmethod
+    def from_dict(cls, ir):
+        ir = cls.ir_body(ir)
+        return cls(
+            magnitude=cls.ir_type_class(ir["magnitude"]).from_dict(ir["magnitude"]),
+            mvmt_type=ir["mvmt_type"],
+        )
+
 
 class ObjectMovement(Movement):
     def __init__(self, magnitude, weight, obj, mvmt_type, height, time=None):
@@ -450,17 +499,19 @@ class ObjectMovement(Movement):
             "overhead_squat": "full"
         }[self.mvmt_type]
 
-    def get_work(self, athlete, env={}):
-        magnitude = self.magnitude.eval_exprs(env=env)
+    def get_work(self, athlete, env={}, measure=None):
+        m = measure or default_measure()
+        magnitude = _magnitude(self.magnitude, env=env)
         if type(magnitude) == Time:
 
             def work_fcn(score):
                 return ObjectMovement(
                     score, self.weight, self.obj, self.mvmt_type, self.height
-                ).get_work(athlete, env=env)
+                ).get_work(athlete, env=env, measure=m)
 
             return work_fcn
-        elif type(magnitude) == Repetition or type(magnitude) == int:
+        elif (type(magnitude) in [Repetition, int, float] or is_array(magnitude)):
+            a = m.athlete(athlete)
             # if from the floor
             if self.mvmt_type in [
                 "clean",
@@ -472,25 +523,21 @@ class ObjectMovement(Movement):
             ]:
                 # set initial height as height of object
                 if self.obj == "barbell":
-                    height_initial = Quantity(17.72, "in")
+                    height_initial = m(17.72, "in")
                 elif "dumbbell" in self.obj:
-                    height_initial = Quantity(4.5, "in")
+                    height_initial = m(4.5, "in")
                 elif "kettlebell" in self.obj:
-                    height_initial = Quantity(5.5, "in")
+                    height_initial = m(5.5, "in")
                 # set final height according to mvmt
                 if self.mvmt_type in ["deadlift", "sumodeadlift"]:
-                    height_final = (
-                        athlete.get_shoulder_height() - athlete.get_arm_length()
-                    )
+                    height_final = a.shoulder_height - a.arm_length
                 elif self.mvmt_type in ["clean", "sumodeadlift_highpull"]:
-                    height_final = athlete.get_shoulder_height()
+                    height_final = a.shoulder_height
                 elif self.mvmt_type in ["snatch", "ground_to_overhead"]:
-                    height_final = (
-                        athlete.get_shoulder_height() + athlete.get_arm_length()
-                    )
-                return magnitude * (
-                    (self.weight.to_quantity() * Quantity("g_0")).to("force_pound")
-                    * (height_final - height_initial)
+                    height_final = a.shoulder_height + a.arm_length
+                return m.work(
+                    magnitude
+                    * (m.force(m.of(self.weight)) * (height_final - height_initial))
                 )
             # if from front rack
             elif self.mvmt_type in [
@@ -505,25 +552,14 @@ class ObjectMovement(Movement):
             ]:
                 # set mvmt distance
                 if self.mvmt_type in ["push_press", "push_jerk", "hang_clean"]:
-                    distance = athlete.get_arm_length()
+                    distance = a.arm_length
                 elif "squat" in self.mvmt_type:
-                    distance = (
-                        athlete.get_shoulder_height()
-                        - athlete.get_squat_bottom_height()
-                    )
+                    distance = a.shoulder_height - a.squat_bottom_height
                 elif self.mvmt_type == "thruster":
-                    distance = (
-                        athlete.get_shoulder_height()
-                        - athlete.get_squat_bottom_height()
-                    ) + athlete.get_arm_length()
+                    distance = a.shoulder_height - a.squat_bottom_height + a.arm_length
                 elif self.mvmt_type == "wallball":
-                    distance = (
-                        self.height.to_quantity() - athlete.get_squat_bottom_height()
-                    )
-                return magnitude * (
-                    (self.weight.to_quantity() * Quantity("g_0")).to("force_pound")
-                    * distance
-                )
+                    distance = m.of(self.height) - a.squat_bottom_height
+                return m.work(magnitude * (m.force(m.of(self.weight)) * distance))
 
     def to_str(self, env={}, eval_exprs=False):
         if not self.height:
@@ -609,6 +645,21 @@ class ObjectMovement(Movement):
             ),
         )
 
+    @classmethod
+    def from_dict(cls, ir):
+        ir = cls.ir_body(ir)
+        return cls(
+            obj=ir["object"],
+            mvmt_type=ir["mvmt_type"],
+            magnitude=cls.ir_type_class(ir["magnitude"]).from_dict(ir["magnitude"]),
+            weight=cls.ir_type_class(ir["weight"]).from_dict(ir["weight"]),
+            height=(
+                cls.ir_type_class(ir["height"]).from_dict(ir["height"])
+                if ir["height"]
+                else None
+            ),
+        )
+
 
 class GymnasticMovement(Movement):
     def __init__(self, magnitude, mvmt_type, time=None):
@@ -623,11 +674,14 @@ class GymnasticMovement(Movement):
         else:
             return Time()
 
-    def get_reps(self, env={}, rep_len=Quantity(10, "ft")):
+    def get_reps(self, env={}, rep_len=None):
+        if rep_len is None:
+            rep_len = Quantity(10, "ft")
         if type(self.magnitude) != Time:
             m = self.magnitude.eval_exprs(env=env)
             if type(m) == Length:
-                return int(Quantity(m.magnitude, m.units).to("ft") / rep_len)
+                q = Quantity(m.magnitude, m.units).to("ft") / rep_len
+                return trunc(q.m_as("dimensionless"))
             else:
                 return m
         else:
@@ -654,65 +708,47 @@ class GymnasticMovement(Movement):
             "box_jump": "lower",
         }[self.mvmt_type.mvmt_type]
 
-    def get_work(self, athlete, env={}):
-        magnitude = self.magnitude.eval_exprs(env=env)
+    def get_work(self, athlete, env={}, measure=None):
+        m = measure or default_measure()
+        magnitude = _magnitude(self.magnitude, env=env)
         if type(magnitude) == Time:
 
             def work_fcn(score):
                 return GymnasticMovement(score, self.mvmt_type).get_work(
-                    athlete, env=env
+                    athlete, env=env, measure=m
                 )
 
             return work_fcn
-        elif type(magnitude) == Repetition or type(magnitude) == int:
+        elif (type(magnitude) in [Repetition, int, float] or is_array(magnitude)):
+            a = m.athlete(athlete)
+            weight, height, arm_length = a.weight, a.height, a.arm_length
             if self.mvmt_type.mvmt_type == "pushup":
-                return (
-                    magnitude
-                    * (0.6 * athlete.get_weight())
-                    * (0.6 * athlete.get_arm_length())
-                )
+                work = magnitude * (0.6 * weight) * (0.6 * arm_length)
             elif self.mvmt_type.mvmt_type in ["pullup", "dip", "handstand_pushup"]:
-                return magnitude * athlete.get_weight() * athlete.get_arm_length()
+                work = magnitude * weight * arm_length
             elif self.mvmt_type.mvmt_type == "burpee":
-                return (
-                    magnitude
-                    * athlete.get_weight()
-                    * (0.6 * athlete.get_height() + Quantity(3, "in"))
-                )
+                work = magnitude * weight * (0.6 * height + m(3, "in"))
             elif self.mvmt_type.mvmt_type == "burpee_pullup":
-                return (
-                    magnitude
-                    * athlete.get_weight()
-                    * (0.6 * athlete.get_height() + athlete.get_arm_length())
-                )
+                work = magnitude * weight * (0.6 * height + arm_length)
             elif self.mvmt_type.mvmt_type == "situp":
-                return (
-                    magnitude
-                    * (0.4 * athlete.get_weight())
-                    * (0.25 * athlete.get_height())
-                )
+                work = magnitude * (0.4 * weight) * (0.25 * height)
             elif self.mvmt_type.mvmt_type == "ghd_situp":
-                return (
-                    magnitude
-                    * (0.5 * athlete.get_weight())
-                    * (0.5 * athlete.get_height())
-                )
+                work = magnitude * (0.5 * weight) * (0.5 * height)
             elif self.mvmt_type.mvmt_type == "muscle_up":
-                return magnitude * athlete.get_weight() * (2 * athlete.get_arm_length())
+                work = magnitude * weight * (2 * arm_length)
             elif self.mvmt_type.mvmt_type in ["pistol", "squat"]:
-                return (
+                work = (
                     magnitude
-                    * athlete.get_weight()
-                    * (athlete.get_height() - athlete.get_squat_bottom_height())
+                    * weight
+                    * (height - a.squat_bottom_height)
                 )
             elif self.mvmt_type.mvmt_type == "double_under":
-                return magnitude * athlete.get_weight() * Quantity(3, "in")
+                work = magnitude * weight * m(3, "in")
             elif self.mvmt_type.mvmt_type == "box_jump":
-                return (
-                    magnitude
-                    * athlete.get_weight()
-                    * self.mvmt_type.height.to_quantity()
-                )
+                work = magnitude * weight * m.of(self.mvmt_type.height)
+            else:
+                return None
+            return m.work(work)
 
     def __str__(self):
         return self.to_str()
@@ -750,6 +786,18 @@ class GymnasticMovement(Movement):
             mvmt_type=cls.textx_type_class(ir.mvmt_type).from_ir(ir.mvmt_type),
         )
 
+    @classmethod
+    def from_dict(cls, ir):
+        ir = cls.ir_body(ir)
+        return cls(
+            magnitude=cls.ir_type_class(ir["magnitude"]).from_dict(ir["magnitude"]),
+            mvmt_type=(
+                cls.ir_type_class(ir["mvmt_type"]).from_dict(ir["mvmt_type"])
+                if type(ir["mvmt_type"]) == dict
+                else ir["mvmt_type"]
+            ),
+        )
+
 
 class GymnasticMovementType(MovementBase):
     def __init__(self, mvmt_type, height=None):
@@ -797,3 +845,11 @@ class GymnasticMovementType(MovementBase):
             ir.mvmt_type,
             cls.textx_type_class(ir.height).from_ir(ir.height) if ir.height else None,
         )
+
+    @classmethod
+    def from_dict(cls, ir):
+        ir = cls.ir_body(ir)
+        return cls(
+            ir["mvmt_type"],
+            cls.ir_type_class(ir["height"]).from_dict(ir["height"]) if ir["height"] else None,
+        )
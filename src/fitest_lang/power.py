@@ -0,0 +1,91 @@
+from types import FunctionType
+
+from .athlete import AthleteCohort
+from .quantity import PhysicalQuantity, Quantity, to_si
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# Average power of leaderboard entries. Scores are numbers or arrays of them,
+# one entry per leaderboard row; with an `AthleteCohort` row i belongs to
+# athlete i. Work is pro rata within a movement: a partial round counts the
+# reps done of each movement, as counted by `get_reps`.
+
+
+def score_array(score):
+    """A score as a number or array (lists become arrays)."""
+    return np.asarray(score, dtype=float) if type(score) in [list, tuple] else score
+
+
+def seconds(time):
+    """Seconds of a Time, pint Quantity, or number (taken as seconds)."""
+    if isinstance(time, PhysicalQuantity) or type(time) == Quantity:
+        return to_si(time)
+    return score_array(time)
+
+
+def joules(work, athlete):
+    """Magnitude in joules of the work `get_work` returned for `athlete`
+    (an array of one per athlete for an `AthleteCohort`)."""
+    if type(work) == FunctionType:
+        raise ValueError("work of movements done for time depends on their scores")
+    if type(athlete) == AthleteCohort:
+        return athlete.work_array(work, "J")
+    return work.to("J").magnitude
+
+
+def partial_work(table, reps_done, athlete):
+    """Joules of the first `reps_done` reps of a rep table, the list of
+    (reps, work) per movement of a program's `get_rep_table`."""
+    reps = np.array([_rep_count(r) for r, _ in table], dtype=float)
+    work = np.stack([np.reshape(joules(w, athlete), -1) for _, w in table])
+    start = np.cumsum(reps) - reps
+    done = np.asarray(reps_done, dtype=float)[..., None]
+    share = np.clip((done - start) / reps, 0.0, 1.0)
+    if type(athlete) == AthleteCohort:
+        return np.sum(share * work.T, axis=-1)
+    return np.sum(share * work[:, 0], axis=-1)
+
+
+def _rep_count(reps):
+    if isinstance(reps, PhysicalQuantity):
+        raise ValueError("movement has no rep count: %r" % (reps,))
+    return max(reps, 1)
+
+
+## RANKING ##
+def _magnitudes(power):
+    if type(power) == Quantity:
+        power = power.magnitude
+    return np.asarray(power, dtype=float)
+
+
+def top_k(power, k):
+    """Indices of the `k` highest powers, highest first."""
+    p = _magnitudes(power)
+    k = min(k, len(p))
+    if k == 0:
+        return np.array([], dtype=int)
+    idx = np.argpartition(-p, k - 1)[:k]
+    return idx[np.argsort(-p[idx], kind="stable")]
+
+
+def rank(power):
+    """Rank of each power, 1 for the highest; ties share the better rank."""
+    p = _magnitudes(power)
+    return len(p) - np.searchsorted(np.sort(p), p, side="right") + 1
+
+
+def percentile_rank(power, of=None):
+    """Percentage of the powers in `of` (default: `power` itself) that each
+    power beats."""
+    p = _magnitudes(power)
+    population = np.sort(p if of is None else _magnitudes(of))
+    return 100.0 * np.searchsorted(population, p, side="left") / len(population)
+
+
+def percentiles(power, q):
+    """Powers at percentiles `q` (0-100)."""
+    if type(power) == Quantity:
+        return Quantity(np.percentile(power.magnitude, q), power.units)
+    return np.percentile(power, q)
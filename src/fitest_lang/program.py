@@ -1,31 +1,88 @@
+import dataclasses
 import datetime
 import itertools as it
-import sys
+from collections import namedtuple
 from types import FunctionType
 
-import numpy as np
-import pandas as pd
-
 from .baseobject import FitestBaseObject, FitestObject
-from .expression import Variable, Value
-from .quantity import Repetition, Time, Work
+from .expression import Variable, fold_constants
+from .quantity import PhysicalQuantity, Quantity, Repetition, Time, Work
 from .movement import MovementSeq, Rest
-from .timer import Timers, Timer, Stopwatch, TimeCap
+from .power import joules, partial_work, score_array, seconds
+from .timer import Timers, Timer, Stopwatch, TimeCap, RoundDesc
+from .lazy import is_array, lazy_import
+
+np = lazy_import("numpy")
 
 
 class ProgramBase(FitestBaseObject, FitestObject):
-    @staticmethod
-    def textx_type_class(textx_type):
-        t = str(textx_type)
-        if not 'Value' in t and not 'Variable' in t:
-            t = t[t.find(".") + 1: t.find(" ")]
-            if t == 'MovementSeq':
-                return MovementSeq
-            return getattr(sys.modules[__name__], t)
-        elif 'Value' in t:
-            return Value
-        elif 'Variable' in t:
-            return Variable
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if not name.startswith("_"):
+            self.__dict__.pop("_plan", None)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_plan", None)
+        return state
+
+    @property
+    def plan(self):
+        """`ExecutionPlan` of a task-priority program, built on first use and
+        rebuilt once its blocks or rounds change, including through nested
+        changes such as editing a rep ladder's values in place."""
+        plan = self.__dict__.get("_plan")
+        if plan is None or plan.key != _plan_key(self):
+            plan = self._plan = ExecutionPlan(self)
+        return plan
+
+    def to_timer_objs(self, env={}, eval_exprs=False):
+        return Timers(list(self.iter_timers(env=env, eval_exprs=eval_exprs)))
+
+    def get_work_cohort(self, cohort, work_units="cal"):
+        """Work of every athlete in an `AthleteCohort`, as an array, in one pass.
+
+        Returns a function of the scores for programs whose work depends on them.
+        """
+        return cohort.work_array(self.get_work(cohort, work_units=work_units), work_units)
+
+
+# rep ladders: a `for N in ...` seq is evaluated for all rounds in one call by
+# binding N to an array of its values, then split back into per-round values
+def _rounds(reps):
+    if type(reps) == Variable:
+        return reps.get_num_rds(), {reps.name: np.array(reps.ints)}
+    return reps.get_num_rds(), {}
+
+
+def _round_env(reps, j):
+    return {reps.name: reps.ints[j]} if type(reps) == Variable else {}
+
+
+def _split_rounds(x, num_rds):
+    """Split a value evaluated over a whole rep ladder into one value per round."""
+    if type(x) in [list, tuple]:
+        if not x:
+            return [type(x)() for _ in range(num_rds)]
+        return [type(x)(r) for r in zip(*[_split_rounds(e, num_rds) for e in x])]
+    elif is_array(x):
+        return _split_array(x, num_rds)
+    elif type(x) == Quantity and is_array(x.magnitude):
+        return [Quantity(m, x.units) for m in _split_array(x.magnitude, num_rds)]
+    elif isinstance(x, PhysicalQuantity) and is_array(x.magnitude):
+        return [x.__class__(m, x.units) for m in _split_array(x.magnitude, num_rds)]
+    else:
+        return [x] * num_rds
+
+
+def _split_array(a, num_rds):
+    # rounds run along the last axis; leading axes (e.g. the athletes of an
+    # AthleteCohort) are kept, and each round keeps a last axis of length 1,
+    # the (athletes, 1) column shape of work that is not split into rounds
+    if a.ndim == 1:
+        return a.tolist()
+    a = np.broadcast_to(a, a.shape[:-1] + (num_rds,))
+    return [a[..., j : j + 1] for j in range(num_rds)]
 
 
 class Program(ProgramBase):
@@ -54,8 +111,11 @@ class Program(ProgramBase):
         else: 
             return Work.from_quantity(quantity_or_fcn)
 
-    def get_power(self, athlete, score):
-        return self.program.get_power(athlete, score)
+    def get_work_cohort(self, cohort, work_units="cal"):
+        return self.program.get_work_cohort(cohort, work_units=work_units)
+
+    def get_power(self, athlete, score, power_units="watt"):
+        return self.program.get_power(athlete, score, power_units=power_units)
 
     def describe(self, by="mvmt_category"):
         return self.program.describe(by=by)
@@ -63,16 +123,13 @@ class Program(ProgramBase):
     def to_timer_objs(self, env={}, eval_exprs=False): 
         return(self.program.to_timer_objs(env=env, eval_exprs=eval_exprs))
 
-    def to_ir(self, top=False, env={}, eval_exprs=False):
-        ir = {"Program": self.program.to_ir()}
+    def iter_timers(self, env={}, eval_exprs=False):
+        return self.program.iter_timers(env=env, eval_exprs=eval_exprs)
+
+    def to_ir(self, top=False, env={}, eval_exprs=False, sections=None):
         if top:
-            return {
-                "type": "Program",
-                "ir": ir,
-                "str": self.__str__(),
-            }
-        else:
-            return ir
+            return self.top_ir(sections)
+        return {"Program": self.program.to_ir()}
 
     def __str__(self):
         return self.program.__str__()
@@ -92,8 +149,209 @@ class Program(ProgramBase):
             )
 
     @classmethod
-    def from_ir(cls, ir):
-        return cls.textx_type_class(ir).from_ir(ir)
+    def from_ir(cls, ir, fold=False):
+        """Build a program from a parsed model; `fold=True` also runs
+        `fold_constants` on it."""
+        program = cls.textx_type_class(ir).from_ir(ir)
+        if fold:
+            fold_constants(program)
+        return program
+
+    @classmethod
+    def from_dict(cls, ir):
+        """Rebuild a program from its `to_ir` dict, or from a parsed `to_json` string
+        (top-level envelope included), without going through the grammar."""
+        if "ir" in ir and "type" in ir:
+            ir = ir["ir"]
+        if "Program" in ir:
+            return cls(cls.ir_type_class(ir["Program"]).from_dict(ir["Program"]))
+        return cls.ir_type_class(ir).from_dict(ir)
+
+
+# descriptions: the shares of a program's rounds (dicts of movement key ->
+# share, see `MovementSeq.describe_rounds`) averaged over the rounds
+def _mean_rows(rows):
+    """Mean of each key over the rows that have it, rounded to 3 places, with
+    a missing "rest" counted as 0. Keys with non-numeric values are dropped.
+
+    Same result as `pd.DataFrame(rows).mean().round(3).to_dict()` with the
+    "rest" column filled, without building a DataFrame.
+    """
+    means = {}
+    for k in dict.fromkeys(k for row in rows for k in row):
+        default = 0.0 if k == "rest" else np.nan
+        try:
+            a = np.array([row.get(k, default) for row in rows], dtype=float)
+        except (TypeError, ValueError):
+            continue
+        present = ~np.isnan(a)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(present, a, 0.0).sum() / present.sum()
+        means[k] = float(np.round(mean, 3))
+    return means
+
+
+def _summarize(rows):
+    rs = _mean_rows(rows)
+    if sum(rs.values()) > 1.0:
+        return dict(
+            **{"work": {k: v for k, v in rs.items() if k != "rest"}},
+            **{"rest": rs["rest"]} if "rest" in rs else {}
+        )
+    else:
+        return rs
+
+
+def describe_many(programs, by="mvmt_category"):
+    """`describe` a whole corpus of programs (or program strings) into one
+    DataFrame, a row per program and a column per movement key and "rest"."""
+    import pandas as pd
+
+    from .dsl import parse_program
+
+    rows = []
+    for program in programs:
+        if type(program) == str:
+            program = parse_program(program)
+        row = {}
+        for k, v in program.describe(by=by).items():
+            if type(v) == dict:
+                row.update(v)
+            else:
+                row[k] = v
+        rows += [row]
+    return pd.DataFrame(rows).fillna(0.0)
+
+
+# execution plan: the rounds of a task-priority program, unrolled once and
+# shared by its analyses
+class PlanBlock(namedtuple("PlanBlock", ["reps", "seq", "rest", "num_rds", "envs"])):
+    @property
+    def env(self):
+        # built on use, so that plans for timers and strings need no numpy
+        return _rounds(self.reps)[1]
+
+
+PlanRound = namedtuple("PlanRound", ["block", "index", "env"])
+
+
+def _plan_key(program):
+    # what the plan is built from: the block nodes and their rounds (a rep
+    # ladder's values or the number of rounds), which can be edited in place
+    return [
+        (
+            id(reps),
+            id(seq),
+            id(rest),
+            tuple(reps.ints) if type(reps) == Variable else reps.get_num_rds(),
+        )
+        for reps, seq, rest in program.to_list()
+    ]
+
+
+class ExecutionPlan:
+    """The (reps, seq, rest) blocks of a task-priority program and the flat
+    sequence of their rounds, each with its `env`.
+
+    A block is evaluated for all its rounds in one call with `env` (rep
+    ladder variables bound to arrays) and split into rounds. Only this
+    structure is kept; values are evaluated on every call, so changes to the
+    movements show up right away.
+    """
+
+    def __init__(self, program):
+        self.blocks = []
+        self.rounds = []
+        for reps, seq, rest in program.to_list():
+            num_rds = reps.get_num_rds()
+            envs = [_round_env(reps, j) for j in range(num_rds)]
+            block = PlanBlock(reps, seq, rest, num_rds, envs)
+            self.blocks += [block]
+            self.rounds += [PlanRound(block, j, e) for j, e in enumerate(envs)]
+        self.key = _plan_key(program)
+
+    def get_reps(self):
+        return [
+            r
+            for b in self.blocks
+            for r in _split_rounds(b.seq.get_reps(env=b.env), b.num_rds)
+        ]
+
+    def get_time(self, **kwargs):
+        """Time of every round, followed by a block's rest after its last round."""
+        ts = []
+        for b in self.blocks:
+            ts += _split_rounds(b.seq.get_time(env=b.env, **kwargs), b.num_rds)
+            if not b.rest is None:
+                ts += [b.rest.get_time(env=_round_env(b.reps, -1))]
+        return ts
+
+    def get_work(self, athlete):
+        """Work of every round (or a function of its score)."""
+        rs = []
+        for b in self.blocks:
+            work = b.seq.get_work(athlete, env=b.env)
+            if type(work) == FunctionType:
+                # work functions of the score are built per round
+                rs += [b.seq.get_work(athlete, env=env) for env in b.envs]
+            else:
+                rs += _split_rounds(work, b.num_rds)
+        return rs
+
+    def get_rep_table(self, athlete):
+        table = []
+        for r in self.rounds:
+            table += r.block.seq.get_rep_table(athlete, env=r.env)
+        return table
+
+    def describe(self, by="mvmt_category"):
+        """Description of every round, each block's followed by its rest."""
+        rs = []
+        for b in self.blocks:
+            if hasattr(b.seq, "describe_rounds"):
+                descs = b.seq.describe_rounds(b.num_rds, env=b.env, by=by)
+            else:
+                # e.g. a time cap: one round at a time
+                descs = [b.seq.describe(by=by, env=env) for env in b.envs]
+            for desc in descs:
+                rs += [desc]
+                if b.rest:
+                    rs += [{"rest": 1.0}]
+        return rs
+
+
+# Work functions of time-priority programs take one score per seq, the
+# rounds completed, each a number or an array of them (e.g. one per
+# leaderboard entry), and return work in `work_units` with the same shape. A
+# seq whose own work is a function (e.g. a swim over a distance) takes that
+# function's scores.
+def _seq_work(work, score, work_units):
+    if type(work) == FunctionType:
+        return work(score).to(work_units)
+    if type(score) in [list, tuple]:
+        score = np.asarray(score)
+    return (score * work).to(work_units)
+
+
+def _round_work(work, score, work_units):
+    if type(work) == FunctionType:
+        work = work(score)
+    return work.to(work_units)
+
+
+# Average power of an AMRAP program over its time for `scores`, one per seq:
+# the rounds completed, or a (rounds, reps) tuple for reps into the next.
+def _amrap_power(program, athlete, scores, power_units):
+    assert len(scores) == len(
+        program.seq
+    ), "scores must correspond one-to-one with mvmt seqs"
+    work = 0
+    for score, seq in zip(scores, program.seq):
+        rounds, reps = score if type(score) == tuple else (score, 0)
+        work = work + score_array(rounds) * joules(seq.get_work(athlete), athlete)
+        work = work + partial_work(seq.get_rep_table(athlete), reps, athlete)
+    time = sum([seconds(t) for t in program.time])
+    return Quantity(work / time, "watt").to(power_units)
 
 
 ## PROGRAM TYPES ##
@@ -104,28 +362,10 @@ class TaskPriority(ProgramBase):
         self.rest = rest
 
     def get_time(self):
-        ts = []
-        for (reps, seq, rest) in self.to_list():
-            for j in range(reps.get_num_rds()):
-                if type(reps) == Variable:
-                    env = {reps.name: reps.ints[j]}
-                else:
-                    env = {}
-                ts += [seq.get_time(env=env)]
-            if not rest is None:
-                ts += [rest.get_time(env=env)]
-        return ts
+        return self.plan.get_time()
 
     def get_reps(self):
-        rs = []
-        for (reps, seq, _) in self.to_list():
-            for j in range(reps.get_num_rds()):
-                if type(reps) == Variable:
-                    env = {reps.name: reps.ints[j]}
-                else:
-                    env = {}
-                rs += [seq.get_reps(env=env)]
-        return rs
+        return self.plan.get_reps()
 
     def get_num_rds(self):
         return np.shape(self.get_rds())
@@ -134,14 +374,7 @@ class TaskPriority(ProgramBase):
         return [r.to_list() for r in self.reps]
 
     def get_work(self, athlete, by_round=False, work_units="cal"):
-        rs = []
-        for (reps, seq, _) in self.to_list():
-            for j in range(reps.get_num_rds()):
-                if type(reps) == Variable:
-                    env = {reps.name: reps.ints[j]}
-                else:
-                    env = {}
-                rs += [seq.get_work(athlete, env=env)]
+        rs = self.plan.get_work(athlete)
 
         if any([type(r) == FunctionType for r in rs]):
 
@@ -149,7 +382,7 @@ class TaskPriority(ProgramBase):
                 assert len(scores) == len(
                     rs
                 ), "scores must correspond one-to-one to mvmt_seqs"
-                results = [r(score).to(work_units) for score, r in zip(scores, rs)]
+                results = [_round_work(r, score, work_units) for score, r in zip(scores, rs)]
                 if by_round:
                     return results
                 else:
@@ -162,87 +395,48 @@ class TaskPriority(ProgramBase):
             else:
                 return sum(rs).to(work_units)
 
+    def get_power(self, athlete, score, power_units="watt"):
+        """Average power when finishing in `score`, a time (numbers are seconds)."""
+        work = joules(self.get_work(athlete), athlete)
+        return Quantity(work / seconds(score), "watt").to(power_units)
+
+    def get_rep_table(self, athlete):
+        return self.plan.get_rep_table(athlete)
+
     def describe(self, by="mvmt_category", verbose=False):
-        rs = []
-        for (reps, seq, rest) in self.to_list():
-            for j in range(reps.get_num_rds()):
-                if type(reps) == Variable:
-                    env = {reps.name: reps.ints[j]}
-                else:
-                    env = {}
-                rs += [seq.describe(by=by, env=env)]
-                if rest:
-                    if seq.time_priority:
-                        rs += [{"rest": 1.0}]
-                    else:
-                        rs += [{"rest": 1.0}]
-        if not "work" in rs[0].keys():
-            rs = pd.DataFrame(rs)
-        else:
-            rs = pd.DataFrame(
-                [
-                    dict(**rs[i]["work"], **{"rest": rs[i]["rest"]})
-                    for i in range(len(rs))
-                ]
-            )
-        if "rest" in rs.columns:
-            rs["rest"] = rs["rest"].fillna(0.0)
-        rs = rs.mean().round(3).to_dict()
-        if sum(rs.values()) > 1.0:
-            return dict(
-                **{"work": {k: v for k, v in rs.items() if k != "rest"}},
-                **{"rest": rs["rest"]}
-            )
-        else:
-            return rs
+        rs = self.plan.describe(by=by)
+        if "work" in rs[0].keys():
+            rs = [dict(**r["work"], **{"rest": r["rest"]}) for r in rs]
+        return _summarize(rs)
 
     def to_list(self):
         return list(it.zip_longest(self.reps, self.seq, self.rest))
 
-    def to_timer_objs(self, env={}, eval_exprs=False): 
-        timers = [] 
-        for i in range(len(self.reps)): 
-            reps_type = type(self.reps[i])
-            
-            if reps_type == Repetition: 
-                if type(self.reps[i].magnitude) == Value: 
-                    num_rds = self.reps[i].magnitude.val
-                else: 
-                    num_rds = self.reps[i].magnitude
-                for j in range(num_rds):
-                    timer_objs = self.seq[i].to_timer_objs().to_list()
-                    for t in timer_objs: 
-                        t.desc = 'round ' + str(j + 1) + ' of ' + str(num_rds) + ':\n' + t.desc
-                    timers += timer_objs
-            
-            elif reps_type == Variable:
-                var_name = self.reps[i].name
-                int_list = self.reps[i].ints
-                num_rds = len(int_list)
-                for j in range(num_rds): 
-                    timer_objs = self.seq[i].to_timer_objs(env={var_name: int_list[j]}, eval_exprs=True).to_list()
-                    for t in timer_objs: 
-                        t.desc = 'round ' + str(j + 1) + ' of ' + str(num_rds) + ':\n' + t.desc
-                    timers += timer_objs
-        
-        return Timers(timers)
-
-    def to_ir(self, top=False, env={}, eval_exprs=False):
-        ir = {
+    def iter_timers(self, env={}, eval_exprs=False):
+        """Timers of the session in order, built as they are consumed."""
+        for block in self.plan.blocks:
+            reps_type = type(block.reps)
+            if reps_type == Repetition:
+                # every round has the same timers
+                timer_objs = list(block.seq.iter_timers(env=env, eval_exprs=eval_exprs))
+            elif not reps_type == Variable:
+                continue
+            for j, round_env in enumerate(block.envs):
+                if reps_type == Variable:
+                    timer_objs = block.seq.iter_timers(env=dict(env, **round_env), eval_exprs=True)
+                for t in timer_objs:
+                    yield dataclasses.replace(t, desc=RoundDesc(j, block.num_rds, t.desc))
+
+    def to_ir(self, top=False, env={}, eval_exprs=False, sections=None):
+        if top:
+            return self.top_ir(sections)
+        return {
             "TaskPriority": {
                 "reps": [r.to_ir() for r in self.reps],
                 "seq": [s.to_ir() for s in self.seq],
                 "rest": [r.to_ir() for r in self.rest],
             }
         }
-        if top:
-            return {
-                "type": "TaskPriority",
-                "ir": ir,
-                "str": self.__str__(),
-            }
-        else:
-            return ir
 
     def __str__(self):
         s = ""
@@ -267,6 +461,15 @@ class TaskPriority(ProgramBase):
             rest=[cls.textx_type_class(r).from_ir(r) for r in ir.rest],
         )
 
+    @classmethod
+    def from_dict(cls, ir):
+        ir = cls.ir_body(ir)
+        return cls(
+            reps=[cls.ir_type_class(r).from_dict(r) for r in ir["reps"]],
+            seq=[cls.ir_type_class(s).from_dict(s) for s in ir["seq"]],
+            rest=[cls.ir_type_class(r).from_dict(r) for r in ir["rest"]],
+        )
+
 
 class TimePriority(ProgramBase):
     def __init__(self, time, seq, rest):
@@ -290,7 +493,7 @@ class TimePriority(ProgramBase):
                 self.seq
             ), "scores must correspond one-to-one with mvmt seqs"
             rs = [
-                (score * seq.get_work(athlete)).to(work_units)
+                _seq_work(seq.get_work(athlete), score, work_units)
                 for score, seq in zip(scores, self.seq)
             ]
             if by_round:
@@ -300,6 +503,9 @@ class TimePriority(ProgramBase):
 
         return work_fcn
 
+    def get_power(self, athlete, scores, power_units="watt"):
+        return _amrap_power(self, athlete, scores, power_units)
+
     def describe(self, by="mvmt_category"):
         rs = []
         for (time, seq, rest) in self.to_list():
@@ -309,59 +515,29 @@ class TimePriority(ProgramBase):
                     rs = rs + [{"rest": 1.0}]
                 else:
                     rs = rs + [{"rest": 1.0}]
-        if not "work" in rs[0].keys():
-            rs = pd.DataFrame(rs)
-        else:
-            rs = pd.DataFrame(
-                [
-                    dict(**rs[i]["work"], **{"rest": rs[i]["rest"]})
-                    for i in range(len(rs))
-                ]
-            )
-        if "rest" in rs.columns:
-            rs["rest"] = rs["rest"].fillna(0.0)
-        rs = rs.mean().round(3).to_dict()
-        if sum(rs.values()) > 1.0:
-            return dict(
-                **{"work": {k: v for k, v in rs.items() if k != "rest"}},
-                **{"rest": rs["rest"]}
-            )
-        else:
-            return rs
+        if "work" in rs[0].keys():
+            rs = [dict(**r["work"], **{"rest": r["rest"]}) for r in rs]
+        return _summarize(rs)
 
     def to_list(self):
         return list(it.zip_longest(self.time, self.seq, self.rest))
 
-    def to_timer_objs(self, env={}, eval_exprs=False): 
-        timer_objs = []
+    def iter_timers(self, env={}, eval_exprs=False):
         for time, seq, rest in self.to_list(): 
+            yield Timer(datetime.timedelta(**time.to_dict()), seq.to_timer_objs(env=env, eval_exprs=eval_exprs))
             if rest: 
-                timer_objs += [
-                    Timer(datetime.timedelta(**time.to_dict()), seq.to_timer_objs(env=env, eval_exprs=eval_exprs)), 
-                    Timer(datetime.timedelta(**rest.magnitude.to_dict()), 'rest')
-                ]
-            else: 
-                timer_objs += [
-                    Timer(datetime.timedelta(**time.to_dict()), seq.to_timer_objs(env=env, eval_exprs=eval_exprs))
-                ]
-        return Timers(timer_objs)
-
-    def to_ir(self, top=False):
-        ir = {
+                yield Timer(datetime.timedelta(**rest.magnitude.to_dict()), 'rest')
+
+    def to_ir(self, top=False, sections=None):
+        if top:
+            return self.top_ir(sections)
+        return {
             "TimePriority": {
                 "time": [t.to_ir() for t in self.time],
                 "seq": [s.to_ir() for s in self.seq],
                 "rest": [r.to_ir() for r in self.rest],
             }
         }
-        if top:
-            return {
-                "type": "TimePriority",
-                "ir": ir,
-                "str": self.__str__(),
-            }
-        else:
-            return ir
 
     def __str__(self):
         s = ""
@@ -384,6 +560,15 @@ class TimePriority(ProgramBase):
             rest=[cls.textx_type_class(r).from_ir(r) for r in ir.rest],
         )
 
+    @classmethod
+    def from_dict(cls, ir):
+        ir = cls.ir_body(ir)
+        return cls(
+            time=[cls.ir_type_class(t).from_dict(t) for t in ir["time"]],
+            seq=[cls.ir_type_class(s).from_dict(s) for s in ir["seq"]],
+            rest=[cls.ir_type_class(r).from_dict(r) for r in ir["rest"]],
+        )
+
 
 class TimeCappedTask(ProgramBase):
     def __init__(self, time, seq, rest):
@@ -411,6 +596,21 @@ class TimeCappedTask(ProgramBase):
         else:
             return sum(rs)
 
+    def get_power(self, athlete, scores, power_units="watt"):
+        """Average power over the time cap for `scores`, one per seq: the reps
+        completed under the cap."""
+        assert len(scores) == len(
+            self.seq
+        ), "scores must correspond one-to-one with mvmt seqs"
+        work = sum(
+            [
+                partial_work(seq.get_rep_table(athlete), score, athlete)
+                for score, seq in zip(scores, self.seq)
+            ]
+        )
+        time = sum([seconds(t) for t in self.time])
+        return Quantity(work / time, "watt").to(power_units)
+
     def describe(self, by="mvmt_category", env={}):
         rs = []
         for (time, seq, rest) in self.to_list():
@@ -420,51 +620,27 @@ class TimeCappedTask(ProgramBase):
                     rs = rs + [{"rest": 1.0}]
                 else:
                     rs = rs + [{"rest": 1.0}]
-        rs = pd.DataFrame(rs)
-        if "rest" in rs.columns:
-            rs["rest"] = rs["rest"].fillna(0.0)
-        rs = rs.mean().round(3).to_dict()
-        if sum(rs.values()) > 1.0:
-            return dict(
-                **{"work": {k: v for k, v in rs.items() if k != "rest"}},
-                **{"rest": rs["rest"]}
-            )
-        else:
-            return rs
+        return _summarize(rs)
 
     def to_list(self):
         return list(it.zip_longest(self.time, self.seq, self.rest))
 
-    def to_timer_objs(self, env={}, eval_exprs=False): 
-        timer_objs = []
+    def iter_timers(self, env={}, eval_exprs=False):
         for time, seq, rest in self.to_list(): 
+            yield TimeCap(datetime.timedelta(**time.to_dict()), seq.to_timer_objs(env=env, eval_exprs=eval_exprs))
             if rest: 
-                timer_objs += [
-                    TimeCap(datetime.timedelta(**time.to_dict()), seq.to_timer_objs(env=env, eval_exprs=eval_exprs)), 
-                    Timer(datetime.timedelta(**rest.magnitude.to_dict()), 'rest')
-                ]
-            else: 
-                timer_objs += [
-                    TimeCap(datetime.timedelta(**time.to_dict()), seq.to_timer_objs(env=env, eval_exprs=eval_exprs))
-                ]
-        return Timers(timer_objs)
-
-    def to_ir(self, top=False):
-        ir = {
+                yield Timer(datetime.timedelta(**rest.magnitude.to_dict()), 'rest')
+
+    def to_ir(self, top=False, sections=None):
+        if top:
+            return self.top_ir(sections)
+        return {
             "TimeCappedTask": {
                 "time": [t.to_ir() for t in self.time],
                 "seq": [s.to_ir() for s in self.seq],
                 "rest": [r.to_ir() for r in self.rest],
             }
         }
-        if top:
-            return {
-                "type": "TimeCappedTask",
-                "ir": ir,
-                "str": self.__str__(),
-            }
-        else:
-            return ir
 
     def __str__(self):
         s = ""
@@ -491,6 +667,15 @@ class TimeCappedTask(ProgramBase):
             rest=[cls.textx_type_class(r).from_ir(r) for r in ir.rest],
         )
 
+    @classmethod
+    def from_dict(cls, ir):
+        ir = cls.ir_body(ir)
+        return cls(
+            time=[cls.ir_type_class(t).from_dict(t) for t in ir["time"]],
+            seq=[cls.ir_type_class(s).from_dict(s) for s in ir["seq"]],
+            rest=[cls.ir_type_class(r).from_dict(r) for r in ir["rest"]],
+        )
+
 
 class TimePriorityBase(ProgramBase):
     def __init__(self, time, seq, rest=None):
@@ -516,15 +701,8 @@ class TimePriorityBase(ProgramBase):
             assert len(scores) == len(
                 self.seq
             ), "scores must correspond one-to-one with mvmt seqs"
-            work = []
-            for score, seq in zip(scores, self.seq):
-                w = seq.get_work(athlete, env=env)
-                if type(w) == FunctionType:
-                    work += [score * w(self.time / score).to(work_units)]
-                else:
-                    work += [w.to(work_units)]
             rs = [
-                (score * seq.get_work(athlete, env=env)).to(work_units)
+                _seq_work(seq.get_work(athlete, env=env), score, work_units)
                 for score, seq in zip(scores, self.seq)
             ]
             if by_round:
@@ -534,60 +712,45 @@ class TimePriorityBase(ProgramBase):
 
         return work_fcn
 
+    def get_power(self, athlete, scores, power_units="watt"):
+        return _amrap_power(self, athlete, scores, power_units)
+
     def describe(self, by="mvmt_category", env={}):
-        rs = []
+        return self.describe_rounds(1, env=env, by=by)[0]
+
+    def describe_rounds(self, num_rds, env={}, by="mvmt_category"):
+        rounds = [[] for _ in range(num_rds)]
         for (time, seq, rest) in self.to_list():
-            rs += [seq.describe(by=by, env=env)]
-            if rest:
-                if seq.time_priority:
-                    rs += [{"rest": 1.0}]
-                else:
+            for rs, desc in zip(rounds, seq.describe_rounds(num_rds, env=env, by=by)):
+                rs += [desc]
+                if rest:
                     rs += [{"rest": 1.0}]
-        rs = pd.DataFrame(rs)
-        if "rest" in rs.columns:
-            rs["rest"] = rs["rest"].fillna(0.0)
-        rs = rs.mean().round(3).to_dict()
-        if sum(rs.values()) > 1.0:
-            return dict(
-                **{"work": {k: v for k, v in rs.items() if k != "rest"}},
-                **{"rest": rs["rest"]}
-            )
-        else:
-            return rs
+        return [_summarize(rs) for rs in rounds]
 
     def to_list(self):
         return list(it.zip_longest(self.time, self.seq, self.rest))
 
-    def to_timer_objs(self, env={}, eval_exprs=False): 
-        timer_objs = []
+    def iter_timers(self, env={}, eval_exprs=False):
         for time, seq, rest in self.to_list():
             # add time and mvmt_seq
             time =  datetime.timedelta(**time.to_dict())
             desc = 'AMRAP ' + time.__str__() + ':\n'
             desc += seq.to_str(include_rest=False, env=env, eval_exprs=eval_exprs)
-            timer_objs += [Timer(time, desc)]   
+            yield Timer(time, desc)
             # add rest
             if rest: 
-                timer_objs += [Timer(datetime.timedelta(**rest.magnitude.to_dict()), 'rest')]
-        
-        return Timers(timer_objs)
+                yield Timer(datetime.timedelta(**rest.magnitude.to_dict()), 'rest')
 
-    def to_ir(self, top=False):
-        ir = {
+    def to_ir(self, top=False, sections=None):
+        if top:
+            return self.top_ir(sections)
+        return {
             "TimePriorityBase": {
                 "time": [t.to_ir() for t in self.time],
                 "seq": [s.to_ir() for s in self.seq],
                 "rest": [r.to_ir() for r in self.rest],
             }
         }
-        if top:
-            return {
-                "type": "TimePriorityBase",
-                "ir": ir,
-                "str": self.__str__(),
-            }
-        else:
-            return ir
 
     def __str__(self):
         s = ""
@@ -615,6 +778,15 @@ class TimePriorityBase(ProgramBase):
             rest=[cls.textx_type_class(r).from_ir(r) for r in ir.rest],
         )
 
+    @classmethod
+    def from_dict(cls, ir):
+        ir = cls.ir_body(ir)
+        return cls(
+            time=[cls.ir_type_class(t).from_dict(t) for t in ir["time"]],
+            seq=[cls.ir_type_class(s).from_dict(s) for s in ir["seq"]],
+            rest=[cls.ir_type_class(r).from_dict(r) for r in ir["rest"]],
+        )
+
 
 class TaskPriorityBase(ProgramBase):
     def __init__(self, reps, seq, rest=None):
@@ -623,25 +795,10 @@ class TaskPriorityBase(ProgramBase):
         self.rest = rest
 
     def get_time(self, by_mvmt=False, env={}):
-        ts = []
-        for (reps, seq, rest) in self.to_list():
-            for j in range(reps.get_num_rds):
-                env = {reps.name: reps.ints[j]} if type(reps) == Variable else {}
-                ts += [seq.get_time(env=env, by_mvmt=by_mvmt)]
-            if not rest is None:
-                ts += [rest.get_time(env=env)]
-        return ts
+        return self.plan.get_time(by_mvmt=by_mvmt)
 
-    def get_reps(self):
-        rs = []
-        for (reps, seq, _) in self.to_list():
-            for j in range(reps.get_num_rds()):
-                if type(reps) == Variable:
-                    env = {reps.name: reps.ints[j]}
-                else:
-                    env = {}
-                rs += [seq.get_reps(env=env)]
-        return rs
+    def get_reps(self, env={}):
+        return self.plan.get_reps()
 
     def get_num_rds(self):
         return np.shape(self.get_rds())
@@ -650,14 +807,7 @@ class TaskPriorityBase(ProgramBase):
         return [r.to_list() for r in self.reps]
 
     def get_work(self, athlete, by_round=False, work_units="cal", env={}):
-        ss = []
-        for (reps, seq, _) in self.to_list():
-            for j in range(reps.get_num_rds()):
-                if type(reps) == Variable:
-                    env = {reps.name: reps.ints[j]}
-                else:
-                    env = {}
-                ss += [seq.get_work(athlete, env=env)]
+        ss = self.plan.get_work(athlete)
         if any([type(r) == FunctionType for r in ss]):
 
             def work_fcn(scores):
@@ -667,7 +817,7 @@ class TaskPriorityBase(ProgramBase):
                     len(scores),
                     len(ss),
                 )
-                rs = [r(score).to(work_units) for score, r in zip(scores, ss)]
+                rs = [_round_work(r, score, work_units) for score, r in zip(scores, ss)]
                 if by_round:
                     return rs
                 else:
@@ -680,80 +830,60 @@ class TaskPriorityBase(ProgramBase):
             else:
                 return sum(ss).to(work_units)
 
+    def get_power(self, athlete, score, power_units="watt"):
+        """Average power when finishing in `score`, a time (numbers are seconds)."""
+        work = joules(self.get_work(athlete), athlete)
+        return Quantity(work / seconds(score), "watt").to(power_units)
+
+    def get_rep_table(self, athlete):
+        return self.plan.get_rep_table(athlete)
+
     def describe(self, env={}, by="mvmt_category"):
-        rs = []
-        for (reps, seq, rest) in self.to_list():
-            for j in range(reps.get_num_rds()):
-                if type(reps) == Variable:
-                    env = {reps.name: reps.ints[j]}
-                else:
-                    env = {}
-                rs += [seq.describe(by=by, env=env)]
-                if rest:
-                    if seq.time_priority:
-                        rs += [{"rest": 1.0}]
-                    else:
-                        rs += [{"rest": 1.0}]
-        rs = pd.DataFrame(rs)
-        if "rest" in rs.columns:
-            rs["rest"] = rs["rest"].fillna(0.0)
-        rs = rs.mean().round(3).to_dict()
-        if sum(rs.values()) > 1.0:
-            return dict(
-                **{"work": {k: v for k, v in rs.items() if k != "rest"}},
-                **{"rest": rs["rest"]} if "rest" in rs else {}
-            )
-        else:
-            return rs
+        return _summarize(self.plan.describe(by=by))
 
     def to_list(self):
         return list(it.zip_longest(self.reps, self.seq, self.rest))
 
     def to_timer_objs(self, by_round=False, env={}, eval_exprs=False):
-        timer_objs = [] 
-        for rep, seq, rest in self.to_list():
+        return Timers(list(self.iter_timers(by_round=by_round, env=env, eval_exprs=eval_exprs)))
+
+    def iter_timers(self, by_round=False, env={}, eval_exprs=False):
+        for block in self.plan.blocks:
+            rep, seq, rest, num_rds = block.reps, block.seq, block.rest, block.num_rds
             reps_type = type(rep)
             if not by_round and not any([type(mvmt.magnitude) == Time for mvmt in seq.movements]) \
                and not seq.rest and not reps_type == Variable: 
                 # add time and mvmt_seq
-                timer_objs += [Stopwatch(rep.__str__() + ':\n' + seq.to_str(include_rest=False) + '\n')]
+                yield Stopwatch(rep.__str__() + ':\n' + seq.to_str(include_rest=False) + '\n')
             else:
                 if any([type(mvmt.magnitude) == Time for mvmt in seq.movements]):
                     mvmt_list = seq.to_list()
                     num_mvmts = len(mvmt_list)
-                    num_rds = rep.magnitude.eval_exprs()
                     for j in range(num_rds): 
                         s = 'round ' + str(j + 1) + ' of ' + str(num_rds) + ':\n'
                         for k in range(num_mvmts):
                             mvmt = mvmt_list[k]
                             if not type(mvmt) == Rest: 
-                                timer_objs += [Timer(datetime.timedelta(**mvmt.magnitude.to_dict(env=env)),
-                                                     "movement " + str(k + 1) + " of " + str(num_mvmts) + ':\n' + mvmt.__str__() + '\n')]
+                                yield Timer(datetime.timedelta(**mvmt.magnitude.to_dict(env=dict(env, **block.envs[j]))),
+                                                     "movement " + str(k + 1) + " of " + str(num_mvmts) + ':\n' + mvmt.__str__() + '\n')
                             else: 
-                                timer_objs += [Timer(datetime.timedelta(**mvmt.magnitude.to_dict(env=env)), 'rest')]
+                                yield Timer(datetime.timedelta(**mvmt.magnitude.to_dict(env=dict(env, **block.envs[j]))), 'rest')
                 elif reps_type == Repetition: 
-                    num_rds = rep.magnitude.eval_exprs()
                     mvmt_list = seq.to_list()
+                    desc = seq.to_str(include_rest=False) + '\n'
                     for j in range(num_rds): 
-                        s = 'round ' + str(j + 1) + ' of ' + str(num_rds) + ':\n'
                         for mvmt in mvmt_list: 
                             if not type(mvmt) == Rest: 
-                                timer_objs += [Stopwatch(s + seq.to_str(include_rest=False) + '\n')]
+                                yield Stopwatch(RoundDesc(j, num_rds, desc))
                             else: 
-                                timer_objs += [Timer(datetime.timedelta(**mvmt.magnitude.to_dict(env=env)), 'rest')]
+                                yield Timer(datetime.timedelta(**mvmt.magnitude.to_dict(env=env)), 'rest')
                 elif reps_type == Variable:
-                    var_name = rep.name
-                    int_list = rep.ints
-                    num_rds = len(int_list)
                     for j in range(num_rds): 
-                        timer_objs += [Stopwatch(('round ' + str(j + 1) + ' of ' + str(num_rds) + ':\n'
-                                                  + seq.to_str(include_rest=False, env={var_name: int_list[j]}, eval_exprs=True) + '\n'))]
+                        yield Stopwatch(RoundDesc(j, num_rds, seq.to_str(include_rest=False, env=block.envs[j], eval_exprs=True) + '\n'))
                         if seq.rest:
-                            timer_objs += [Timer(datetime.timedelta(**seq.rest[j].magnitude.to_dict(env=env)), 'rest')]
+                            yield Timer(datetime.timedelta(**seq.rest[j].magnitude.to_dict(env=env)), 'rest')
             if rest: 
-                timer_objs += [Timer(rest.get_time().to_timedelta(), 'rest')]
-
-        return Timers(timer_objs)
+                yield Timer(rest.get_time().to_timedelta(), 'rest')
 
     def to_str(self, by_round=False, eval_exprs=False):
         s = ""
@@ -784,22 +914,16 @@ class TaskPriorityBase(ProgramBase):
                         s += rest.__str__() + "\n\n"
         return s
 
-    def to_ir(self, top=False):
-        ir = {
+    def to_ir(self, top=False, sections=None):
+        if top:
+            return self.top_ir(sections)
+        return {
             "TaskPriorityBase": {
                 "reps": [r.to_ir() for r in self.reps],
                 "seq": [s.to_ir() for s in self.seq],
                 "rest": [r.to_ir() for r in self.rest],
             }
         }
-        if top:
-            return {
-                "type": "TaskPriorityBase",
-                "ir": ir,
-                "str": self.__str__(),
-            }
-        else:
-            return ir
 
     def __str__(self):
         return self.to_str()
@@ -816,3 +940,12 @@ class TaskPriorityBase(ProgramBase):
             seq=[cls.textx_type_class(s).from_ir(s) for s in ir.seq],
             rest=[cls.textx_type_class(r).from_ir(r) for r in ir.rest],
         )
+
+    @classmethod
+    def from_dict(cls, ir):
+        ir = cls.ir_body(ir)
+        return cls(
+            reps=[cls.ir_type_class(r).from_dict(r) for r in ir["reps"]],
+            seq=[cls.ir_type_class(s).from_dict(s) for s in ir["seq"]],
+            rest=[cls.ir_type_class(r).from_dict(r) for r in ir["rest"]],
+        )
@@ -1,25 +1,215 @@
 import datetime
-import sys
-
-import pint
+import os
 
 from .baseobject import FitestBaseObject, FitestObject
 from .expression import Value, Variable
+from .lazy import is_array
+
+# building pint's UnitRegistry is the single most expensive step of importing
+# the package, so it is built on first use; `Quantity` stands in for its
+# Quantity class until then
+_units = None
+
+
+def get_units():
+    """The package's pint UnitRegistry, built on first use."""
+    global _units
+    if _units is None:
+        import pint
+
+        _units = pint.UnitRegistry()
+    return _units
+
+
+def __getattr__(name):
+    if name == "units":
+        return get_units()
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+class _QuantityClass(type):
+    # `Quantity(...)` builds a Quantity of the registry, and `type(q) ==
+    # Quantity` holds for those, without building the registry to find out
+    def __call__(cls, *args, **kwargs):
+        return get_units().Quantity(*args, **kwargs)
+
+    def __eq__(cls, other):
+        return other is cls or (_units is not None and other is _units.Quantity)
+
+    __hash__ = type.__hash__
+
+    def __instancecheck__(cls, obj):
+        return _units is not None and isinstance(obj, _units.Quantity)
+
+    def __getattr__(cls, name):
+        return getattr(get_units().Quantity, name)
+
+
+class Quantity(metaclass=_QuantityClass):
+    pass
+
+
+# set FITEST_LANG_SI_UNITS=0 to do all unit arithmetic of the movement
+# physics with pint instead of SI floats
+SI_UNITS = os.environ.get("FITEST_LANG_SI_UNITS", "1") != "0"
+
+
+# SI factors and dimensions of the units the grammar allows, under their
+# grammar spelling and pint's canonical name
+SI_FACTORS = {}
+for _names, _dimension, _factor in [
+    (["kg", "kilogram"], "mass", 1.0),
+    (["lb", "pound"], "mass", 0.45359237),
+    (["meter"], "length", 1.0),
+    (["km", "kilometer"], "length", 1000.0),
+    (["mile"], "length", 1609.344),
+    (["ft", "foot"], "length", 0.3048),
+    (["inch", "in"], "length", 0.0254),
+    (["sec", "s", "second"], "time", 1.0),
+    (["min", "minute"], "time", 60.0),
+    (["hr", "hour"], "time", 3600.0),
+    (["J", "joule"], "energy", 1.0),
+    (["cal", "calorie"], "energy", 4.184),
+]:
+    for _name in _names:
+        SI_FACTORS[_name] = (_factor, _dimension)
+G_0 = 9.80665
+
+
+def si_factor(units):
+    """Factor converting a magnitude in `units` to SI base units.
+
+    Units outside `SI_FACTORS` are converted with pint once and remembered.
+    """
+    key = units if type(units) == str else str(units)
+    try:
+        return SI_FACTORS[key][0]
+    except KeyError:
+        factor = Quantity(1.0, units).to_base_units().magnitude
+        SI_FACTORS[key] = (factor, None)
+        return factor
+
+
+def to_si(q, env={}):
+    """SI magnitude of a pint Quantity or PhysicalQuantity as a float (or array)."""
+    if isinstance(q, PhysicalQuantity):
+        magnitude = q.magnitude
+        if not (type(magnitude) in [int, float] or is_array(magnitude)):
+            magnitude = magnitude.eval_exprs(env=env)
+        return magnitude * si_factor(q.units)
+    return q.magnitude * si_factor(q.units)
+
+
+class Measure:
+    """Builds the quantities the movement physics works with.
+
+    With `si=True` these are plain floats in SI units (the fast path);
+    otherwise pint Quantities, which check dimensions and serve as the
+    reference the SI path is tested against.
+    """
+
+    def __init__(self, si=True):
+        self.si = si
+
+    def __call__(self, magnitude, units):
+        if self.si:
+            return magnitude * si_factor(units)
+        return Quantity(magnitude, units)
+
+    def of(self, q, env={}):
+        """`q`, a pint Quantity or PhysicalQuantity, in this measure."""
+        if self.si:
+            return to_si(q, env=env)
+        if isinstance(q, PhysicalQuantity):
+            return q.to_quantity(env=env)
+        return q
+
+    def magnitude_in(self, x, units):
+        """Magnitude of `x` (in this measure) expressed in `units`."""
+        if self.si:
+            return x / si_factor(units)
+        return x.to(units).magnitude
+
+    def athlete(self, athlete):
+        """The athlete's derived measures (an `AthleteMeasures`) in this measure."""
+        if self.si:
+            return athlete.si
+        return athlete.quantities
+
+    def force(self, mass):
+        """Weight force of `mass` (in this measure)."""
+        if self.si:
+            return mass * G_0
+        return (mass * Quantity("g_0")).to("force_pound")
+
+    def work(self, x):
+        """Work `x` (in this measure) as a pint Quantity."""
+        if self.si:
+            return Quantity(x, "joule")
+        return x
+
+
+SI = Measure(si=True)
+PINT = Measure(si=False)
+
+
+def default_measure():
+    return SI if SI_UNITS else PINT
+
+
+_pint_units = {}
+
+
+def _pint_unit(units):
+    # the pint Unit that pint arithmetic on `units` gives its result, so the
+    # float fast paths return the same units as pint (e.g. "minute" for "min")
+    try:
+        return _pint_units[units]
+    except KeyError:
+        unit = _pint_units[units] = get_units().Unit(units)
+        return unit
+
 
-units = pint.UnitRegistry()
-Quantity = units.Quantity
+def _si_entry(units):
+    return SI_FACTORS.get(units if type(units) == str else str(units), (None, None))
+
+
+_conversion_factors = {}
+
+
+def _conversion_factor(src, dst):
+    # pint's own factor from `src` to `dst`, so that converted magnitudes keep
+    # its types (ints for integral factors, e.g. min to sec) and its rounding
+    key = (str(src), str(dst))
+    try:
+        return _conversion_factors[key]
+    except KeyError:
+        factor = _conversion_factors[key] = Quantity(1, src).to(dst).magnitude
+        return factor
+
+
+def _add(a, b):
+    # (magnitude, units) of a + b, in a's units; like pint, b is only
+    # converted when its units differ
+    fa, da = _si_entry(a.units)
+    fb, db = _si_entry(b.units)
+    if da is not None and da == db:
+        if fa == fb:
+            magnitude = b.magnitude
+        else:
+            magnitude = b.magnitude * _conversion_factor(b.units, a.units)
+        return a.magnitude + magnitude, _pint_unit(a.units)
+    q = Quantity(a.magnitude, a.units) + Quantity(b.magnitude, b.units)
+    return q.magnitude, q.units
+
+
+def _is_set(magnitude):
+    # arrays of per-round magnitudes have no truth value
+    return is_array(magnitude) or bool(magnitude)
 
 
 class PhysicalQuantityBase(FitestBaseObject, FitestObject):
-    @staticmethod
-    def textx_type_class(textx_type):
-        t = str(textx_type)
-        if not 'Value' in t and not 'Variable' in t:
-            return getattr(sys.modules[__name__], t[t.find(".") + 1: t.find(" ")])
-        elif 'Value' in t:
-            return Value
-        elif 'Variable' in t:
-            return Variable
+    pass
 
 
 class PhysicalQuantity(PhysicalQuantityBase):
@@ -34,7 +224,7 @@ class PhysicalQuantity(PhysicalQuantityBase):
             return self.__class__(self.magnitude, self.units)
 
     def to_quantity(self, env={}):
-        if not type(self.magnitude) in [int, float]:
+        if not (type(self.magnitude) in [int, float] or is_array(self.magnitude)):
             return Quantity(self.magnitude.eval_exprs(env=env), self.units)
         else:
             return Quantity(self.magnitude, self.units)
@@ -64,25 +254,24 @@ class PhysicalQuantity(PhysicalQuantityBase):
             + ")>"
         )
 
+    def to_si(self, env={}):
+        return to_si(self, env=env)
+
     def __add__(self, other):
-        q = Quantity(self.magnitude, self.units) + Quantity(
-            other.magnitude, other.units
-        )
-        return self.__class__(q.magnitude, q.units)
+        return self.__class__(*_add(self, other))
 
     def __radd__(self, other):
-        q = Quantity(self.magnitude, self.units) + Quantity(
-            other.magnitude, other.units
-        )
-        return self.__class__(q.magnitude, q.units)
+        return self.__class__(*_add(self, other))
 
     def __mul__(self, other, env={}):
-        if not type(self.magnitude) in [int, float]:
+        if not (type(self.magnitude) in [int, float] or is_array(self.magnitude)):
             magnitude = self.magnitude.eval_exprs(env=env)
         else:
             magnitude = self.magnitude
         if type(other) == Quantity or type(other) == self.__class__:
             q = Quantity(magnitude, self.units) * Quantity(other.magnitude, other.units)
+        elif type(other) in [int, float] and _si_entry(self.units)[0] is not None:
+            return self.__class__(magnitude * other, _pint_unit(self.units))
         elif type(other) in [int, float]:
             q = Quantity(magnitude, self.units) * other
         if not q.dimensionless:
@@ -91,12 +280,14 @@ class PhysicalQuantity(PhysicalQuantityBase):
             return q.magnitude
 
     def __truediv__(self, other, env={}):
-        if not type(self.magnitude) in [int, float]:
+        if not (type(self.magnitude) in [int, float] or is_array(self.magnitude)):
             magnitude = self.magnitude.eval_exprs(env=env)
         else:
             magnitude = self.magnitude
         if type(other) == Quantity or type(other) == self.__class__:
             q = Quantity(magnitude, self.units) / Quantity(other.magnitude, other.units)
+        elif type(other) in [int, float] and _si_entry(self.units)[0] is not None:
+            return self.__class__(magnitude / other, _pint_unit(self.units))
         elif type(other) in [int, float]:
             q = Quantity(magnitude, self.units) / other
         if not q.dimensionless:
@@ -111,6 +302,14 @@ class PhysicalQuantity(PhysicalQuantityBase):
             units=ir.units,
         )
 
+    @classmethod
+    def from_dict(cls, ir):
+        ir = cls.ir_body(ir)
+        return cls(
+            magnitude=cls.ir_type_class(ir["magnitude"]).from_dict(ir["magnitude"]),
+            units=ir["units"],
+        )
+
     @classmethod
     def from_quantity(cls, q, num_decimals=1): 
         return cls(round(q.magnitude, num_decimals), q.units)
@@ -132,7 +331,7 @@ class Repetition(PhysicalQuantity):
     def __init__(self, magnitude=None, units=None):
         self.magnitude = magnitude
         self.units = units
-        self.is_variable = not (self.magnitude and self.units)
+        self.is_variable = not (self.units and _is_set(self.magnitude))
 
     def get_num_rds(self):
         return self.magnitude.eval_exprs()
@@ -165,7 +364,7 @@ class Time(PhysicalQuantity):
     def __init__(self, magnitude=None, units=None):
         self.magnitude = magnitude
         self.units = units
-        self.is_variable = not (self.magnitude and self.units)
+        self.is_variable = not (self.units and _is_set(self.magnitude))
 
     def to_str(self, env={}, eval_exprs=False):
         if not self.is_variable:
@@ -189,19 +388,13 @@ class Time(PhysicalQuantity):
 
     def __add__(self, other):
         if not self.is_variable and not other.is_variable:
-            q = Quantity(self.magnitude, self.units) + Quantity(
-                other.magnitude, other.units
-            )
-            return self.__class__(q.magnitude, q.units)
+            return self.__class__(*_add(self, other))
         else:
             return self.__class__()
 
     def __radd__(self, other):
         if not self.is_variable and not other.is_variable:
-            q = Quantity(self.magnitude, self.units) + Quantity(
-                other.magnitude, other.units
-            )
-            return self.__class__(q.magnitude, q.units)
+            return self.__class__(*_add(self, other))
         else:
             return self.__class__()
 
@@ -0,0 +1,210 @@
+import asyncio
+import heapq
+import inspect
+import itertools as it
+import time
+from collections import namedtuple
+
+from .timer import Timers, Stopwatch
+
+# Runs timer sessions on an asyncio event loop. All sessions share a single
+# scheduler and one heap of interval deadlines, so a process can drive
+# thousands of them without a task (or a sleep loop) per session. Each
+# interval starts at the deadline of the one before, not at the moment the
+# loop got round to it, so late wake-ups never accumulate into drift.
+
+# kind is one of 'start', 'end', 'pause', 'resume' or 'finish'; time is the
+# clock time of the boundary, which may be a little before it was handled
+TimerEvent = namedtuple("TimerEvent", ["kind", "session", "index", "timer", "time"])
+
+
+class Session:
+    """One run through a sequence of timers, e.g. `program.to_timer_objs()`
+    or `program.iter_timers()`; the timers are taken one at a time.
+
+    Timers and time caps end on their own, stopwatches when skipped.
+    """
+
+    def __init__(self, timers, name=None):
+        if type(timers) == Timers:
+            timers = timers.to_list()
+        self.name = name
+        self.index = -1
+        self.timer = None
+        self.started_at = None
+        self.paused_at = None
+        self.done = False
+        self._timers = iter(timers)
+        self._gen = 0
+
+    @property
+    def paused(self):
+        return self.paused_at is not None
+
+    def elapsed(self, now):
+        """Seconds into the current interval at clock time `now`."""
+        if self.timer is None:
+            return 0.0
+        return (self.paused_at if self.paused else now) - self.started_at
+
+    def remaining(self, now):
+        """Seconds left in the current interval, None for a stopwatch."""
+        if self.timer is None or type(self.timer) == Stopwatch:
+            return None
+        return max(self.timer.time.total_seconds() - self.elapsed(now), 0.0)
+
+    def deadline(self):
+        if self.timer is None or self.paused or type(self.timer) == Stopwatch:
+            return None
+        return self.started_at + self.timer.time.total_seconds()
+
+    def _advance(self, at):
+        # pending heap entries of the previous interval are now stale
+        self._gen += 1
+        self.paused_at = None
+        self.timer = next(self._timers, None)
+        if self.timer is None:
+            self.done = True
+        else:
+            self.index += 1
+            self.started_at = at
+
+
+class Runtime:
+    """Drives `Session`s on the running event loop.
+
+    `on_event` is called with a `TimerEvent` for every boundary and control;
+    when it returns an awaitable, the events handled in one step are awaited
+    concurrently. `clock` and `sleep` default to `time.monotonic` and
+    `asyncio.sleep`; pass a `FakeClock` (and its `sleep`) to test without
+    waiting.
+    """
+
+    def __init__(self, on_event=None, clock=time.monotonic, sleep=asyncio.sleep):
+        self.on_event = on_event
+        self.clock = clock
+        self.sleep = sleep
+        self.sessions = set()
+        self._heap = []
+        self._events = []
+        self._seq = it.count()
+        self._wakeup = None
+
+    ## CONTROLS ##
+    def start(self, session, at=None):
+        """Add `session` and start its first interval (at clock time `at`)."""
+        self.sessions.add(session)
+        self._next_interval(session, self.clock() if at is None else at)
+        self._wake()
+        return session
+
+    def pause(self, session):
+        if session.timer is None or session.done or session.paused:
+            return
+        session.paused_at = self.clock()
+        session._gen += 1
+        self._emit("pause", session, session.paused_at)
+        self._wake()
+
+    def resume(self, session):
+        if not session.paused:
+            return
+        now = self.clock()
+        session.started_at += now - session.paused_at
+        session.paused_at = None
+        session._gen += 1
+        self._push(session)
+        self._emit("resume", session, now)
+        self._wake()
+
+    def skip(self, session):
+        """End the current interval now, which is how a stopwatch is stopped;
+        the next interval starts running even if this one was paused."""
+        if session.timer is None or session.done:
+            return
+        self._next_interval(session, self.clock())
+        self._wake()
+
+    ## SCHEDULING ##
+    async def step(self, now=None):
+        """Handle every boundary due by clock time `now` and dispatch the
+        pending events. Returns the next deadline, or None."""
+        now = self.clock() if now is None else now
+        while self._heap and self._heap[0][0] <= now:
+            deadline, _, gen, session = heapq.heappop(self._heap)
+            if gen == session._gen:
+                self._next_interval(session, deadline)
+        # callbacks may use the controls, which queue events of their own
+        while self._events:
+            await self._dispatch()
+        while self._heap and self._heap[0][2] != self._heap[0][3]._gen:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    async def run(self, until_idle=True):
+        """Drive the sessions until all have finished, or, with
+        `until_idle=False`, until cancelled."""
+        self._wakeup = asyncio.Event()
+        while True:
+            # cleared before stepping, so controls used by the callbacks
+            # still cut the wait short
+            self._wakeup.clear()
+            deadline = await self.step()
+            if until_idle and not self.sessions:
+                return
+            delay = None if deadline is None else max(deadline - self.clock(), 0.0)
+            await self._wait(delay)
+
+    async def _wait(self, delay):
+        waits = [asyncio.ensure_future(self._wakeup.wait())]
+        if delay is not None:
+            waits.append(asyncio.ensure_future(self.sleep(delay)))
+        try:
+            await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for w in waits:
+                w.cancel()
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _next_interval(self, session, at):
+        if session.timer is not None:
+            self._emit("end", session, at)
+        session._advance(at)
+        if session.done:
+            self._emit("finish", session, at)
+            self.sessions.remove(session)
+        else:
+            self._emit("start", session, at)
+            self._push(session)
+
+    def _push(self, session):
+        deadline = session.deadline()
+        if deadline is not None:
+            heapq.heappush(self._heap, (deadline, next(self._seq), session._gen, session))
+
+    def _emit(self, kind, session, at):
+        self._events.append(TimerEvent(kind, session, session.index, session.timer, at))
+
+    async def _dispatch(self):
+        events, self._events = self._events, []
+        if self.on_event is None:
+            return
+        results = [self.on_event(e) for e in events]
+        await asyncio.gather(*[r for r in results if inspect.isawaitable(r)])
+
+
+class FakeClock:
+    """Clock for tests: time only passes when something sleeps on it."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, delay):
+        self.now += delay
+        await asyncio.sleep(0)
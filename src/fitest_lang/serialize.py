@@ -0,0 +1,87 @@
+import json
+
+from .baseobject import TOP_SECTIONS
+from .movement import MovementSeq
+from .program import Program, TaskPriority, TimePriority, TimeCappedTask, TimePriorityBase, TaskPriorityBase
+
+# Writes the JSON of `to_ir` / `to_ir(top=True)` straight to a file-like
+# object, node by node, instead of building the nested dict and then the
+# whole (indented) string. Only movements and quantities, the leaves of the
+# IR, are turned into dicts, one at a time. Output is compact; the parsed
+# result equals `to_ir`.
+
+# IR fields of the composite nodes, in `to_ir` order; each holds a list of nodes
+IR_FIELDS = {
+    MovementSeq: ("rest", "movements"),
+    TaskPriority: ("reps", "seq", "rest"),
+    TimePriority: ("time", "seq", "rest"),
+    TimeCappedTask: ("time", "seq", "rest"),
+    TimePriorityBase: ("time", "seq", "rest"),
+    TaskPriorityBase: ("reps", "seq", "rest"),
+}
+
+_encode = json.JSONEncoder(separators=(",", ":")).encode
+
+
+def dump(obj, fp, top=True, sections=None):
+    """Write the JSON of `obj.to_ir(top, sections)` to `fp`."""
+    if top:
+        _write_top(obj, fp.write, sections)
+    else:
+        _write_ir(obj, fp.write)
+
+
+def dump_programs(programs, fp, top=True, sections=None):
+    """Write programs (or program strings) as NDJSON, one per line, taking
+    them one at a time. Returns the number written."""
+    from .dsl import parse_program
+
+    n = 0
+    for program in programs:
+        if type(program) == str:
+            program = parse_program(program, cache=False)
+        dump(program, fp, top=top, sections=sections)
+        fp.write("\n")
+        n += 1
+    return n
+
+
+def load_programs(fp):
+    """Programs of an NDJSON file written by `dump_programs`, lazily."""
+    for line in fp:
+        if line.strip():
+            yield Program.from_dict(json.loads(line))
+
+
+def _write_top(obj, write, sections):
+    write('{"type":' + _encode(type(obj).__name__))
+    for section in obj.top_sections if sections is None else sections:
+        if section not in TOP_SECTIONS:
+            raise ValueError("unknown top-level IR section: " + repr(section))
+        write("," + _encode(section) + ":")
+        if section == "ir":
+            _write_ir(obj, write)
+        else:
+            write(_encode(TOP_SECTIONS[section](obj)))
+    write("}")
+
+
+def _write_ir(obj, write):
+    if type(obj) == Program:
+        write('{"Program":')
+        _write_ir(obj.program, write)
+        write("}")
+        return
+    fields = IR_FIELDS.get(type(obj))
+    if fields is None:
+        write(_encode(obj.to_ir()))
+        return
+    write("{" + _encode(type(obj).__name__) + ":{")
+    for i, field in enumerate(fields):
+        write(("," if i else "") + _encode(field) + ":[")
+        for j, node in enumerate(getattr(obj, field)):
+            if j:
+                write(",")
+            _write_ir(node, write)
+        write("]")
+    write("}}")
@@ -1,7 +1,12 @@
+from collections import namedtuple
 from dataclasses import dataclass
 from datetime import timedelta
 from typing import Union
 
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+
 @dataclass
 class Timers:
     timers: list
@@ -14,40 +19,154 @@ class Timers:
     def to_list(self): 
         return self.timers
 
+    def to_timeline(self, splits=None):
+        return Timeline.from_timers(self, splits=splits)
+
+
+class RoundDesc(namedtuple("RoundDesc", ["index", "num_rds", "desc"])):
+    """Description of a timer in round `index` (from 0) of `num_rds`: the
+    seq's `desc`, shared by all rounds, under a round header that is only
+    formatted by `str`. A nested `Timers` desc (a time cap or AMRAP round)
+    is written out as its nested descs."""
+
+    __slots__ = ()
+
+    @property
+    def header(self):
+        return 'round %d of %d:\n' % (self.index + 1, self.num_rds)
+
+    def __str__(self):
+        return self.header + _flat_desc(self.desc)
+
+
+def _desc_json(desc):
+    if type(desc) == str:
+        return desc
+    if type(desc) == RoundDesc:
+        return str(desc)
+    return desc.to_json()
+
 
 @dataclass
 class Stopwatch:
-    desc: str
+    desc: Union[str, RoundDesc]
 
     def __dict__(self): 
         return {
             'type': 'stopwatch', 
-            'desc': self.desc
+            'desc': _desc_json(self.desc)
         }
 
 
 @dataclass
 class Timer:
     time: timedelta
-    desc: Union[str, Stopwatch]
+    desc: Union[str, RoundDesc, Stopwatch]
 
     def __dict__(self): 
         return {
             'type': 'timer',
             'time': { 'seconds': self.time.total_seconds() }, 
-            'desc': self.desc if type(self.desc) == str else self.desc.to_json()
+            'desc': _desc_json(self.desc)
         }
 
 
 @dataclass
 class TimeCap:
     time: timedelta
-    desc: Union[str, Stopwatch]
+    desc: Union[str, RoundDesc, Stopwatch]
 
     def __dict__(self): 
         return {
             'type': 'timecap',
             'time': { 'seconds': self.time.total_seconds() }, 
-            'desc': self.desc if type(self.desc) == str else self.desc.to_json()
+            'desc': _desc_json(self.desc)
         }
-        
\ No newline at end of file
+        
+
+# kinds of the intervals of a `Timeline`
+STOPWATCH, TIMER, TIMECAP = 0, 1, 2
+
+
+@dataclass(eq=False)
+class Timeline:
+    """Timers compiled into intervals at absolute offsets (in seconds) from
+    the start of the session, for looking up what is running at time t.
+
+    `start`, `duration`, `kind` and `desc` are arrays with one entry per
+    interval; `desc` indexes into `descs`. A timer whose desc is itself a
+    `Timers` (an AMRAP or time cap over a seq) is one interval described by
+    its nested descs. Stopwatches last as long as their split, or forever
+    when it is not known yet.
+    """
+    start: 'np.ndarray'
+    duration: 'np.ndarray'
+    kind: 'np.ndarray'
+    desc: 'np.ndarray'
+    descs: list
+
+    @classmethod
+    def from_timers(cls, timers, splits=None):
+        """Compile `Timers`; `splits` are the seconds taken by the
+        stopwatches, in order (missing ones are open-ended)."""
+        splits = list(splits or [])
+        descs, desc_index = [], {}
+        duration, kind, desc = [], [], []
+        for t in timers.to_list():
+            if type(t) == Stopwatch:
+                kind.append(STOPWATCH)
+                duration.append(splits.pop(0) if splits else np.inf)
+            else:
+                kind.append(TIMECAP if type(t) == TimeCap else TIMER)
+                duration.append(t.time.total_seconds())
+            s = _flat_desc(t.desc)
+            if s not in desc_index:
+                desc_index[s] = len(descs)
+                descs.append(s)
+            desc.append(desc_index[s])
+        duration = np.array(duration, dtype=float)
+        start = np.concatenate([[0.0], np.cumsum(duration)])[:-1]
+        return cls(start, duration, np.array(kind, dtype=np.int8), np.array(desc, dtype=np.intp), descs)
+
+    def __post_init__(self):
+        # ends with a -inf sentinel, so that index -1 (no interval) is never running
+        self._end = np.append(self.start + self.duration, -np.inf)
+
+    @property
+    def end(self):
+        return self._end[:-1]
+
+    def __len__(self):
+        return len(self.start)
+
+    def total_seconds(self):
+        return float(np.sum(self.duration))
+
+    def active(self, t):
+        """Index of the interval running at `t` seconds (a number or array),
+        -1 before the start or after the end."""
+        t = np.asarray(t, dtype=float)
+        # zero-length intervals share their start with the next one and are
+        # never active, as side='right' steps over them
+        i = np.searchsorted(self.start, t, side='right') - 1
+        return np.where(t < self._end[i], i, -1)
+
+    def remaining(self, t):
+        """Seconds left in the interval running at `t`, 0 when none is."""
+        t = np.asarray(t, dtype=float)
+        return np.maximum(self._end[self.active(t)] - t, 0.0)
+
+    def desc_at(self, t):
+        """Description of the interval running at `t` seconds, or None."""
+        i = int(self.active(t))
+        return self.descs[self.desc[i]] if i >= 0 else None
+
+
+def _flat_desc(desc):
+    if type(desc) == str:
+        return desc
+    if type(desc) == RoundDesc:
+        return desc.header + _flat_desc(desc.desc)
+    if type(desc) == Timers:
+        return '\n'.join(_flat_desc(t.desc) for t in desc.to_list())
+    return _flat_desc(desc.desc)
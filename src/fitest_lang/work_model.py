@@ -0,0 +1,125 @@
+from types import FunctionType
+
+from .athlete import AthleteCohort
+from .quantity import Quantity
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+
+# athlete features the movement physics is linear in: work is a sum of
+# load x distance terms, where the load is the athlete's or an object's
+# weight and the distance a length of the athlete or a constant
+LENGTHS = ["height", "shoulder_height", "arm_length", "squat_bottom_height"]
+FEATURES = ["1", "mass"] + LENGTHS + ["mass*" + length for length in LENGTHS]
+
+
+def features(athletes):
+    """Feature matrix, one row per athlete, of an `AthleteCohort` or `Athlete`."""
+    if not type(athletes) == AthleteCohort:
+        athletes = AthleteCohort.from_athletes([athletes])
+    mass = athletes.weight
+    lengths = [getattr(athletes, length) for length in LENGTHS]
+    return np.stack(
+        [np.ones_like(mass), mass] + lengths + [mass * length for length in lengths],
+        axis=1,
+    )
+
+
+class WorkModel:
+    """Work of a program compiled into coefficients over `FEATURES`.
+
+    `coefs` has one row of coefficients per score when the program's work
+    depends on its scores (time-priority parts, where work is linear in the
+    score of each seq), and a single row otherwise, in which case
+    `num_scores` is None.
+    """
+
+    def __init__(self, coefs, num_scores=None, work_units="cal"):
+        self.coefs = np.asarray(coefs, dtype=float)
+        self.num_scores = num_scores
+        self.work_units = work_units
+
+    def get_work(self, athletes, scores=None):
+        """Work of an `Athlete`, or array of work of an `AthleteCohort`, as a
+        dot product with the athletes' features."""
+        work = features(athletes) @ self.coefs.T
+        if self.num_scores is None:
+            work = work[:, 0]
+        else:
+            assert len(scores) == self.num_scores, "scores must correspond one-to-one to coefs"
+            work = work @ np.asarray(scores, dtype=float)
+        if not type(athletes) == AthleteCohort:
+            work = work[0]
+        return Quantity(work, self.work_units)
+
+    def verify(self, program, athletes=None, rtol=1e-9):
+        """Compare against `program.get_work_cohort`, raising ValueError on a mismatch."""
+        if athletes is None:
+            athletes = _probe_cohort(seed=1)
+        scores = None
+        expected = program.get_work_cohort(athletes, work_units=self.work_units)
+        if self.num_scores is not None:
+            scores = np.random.default_rng(1).integers(1, 20, self.num_scores).tolist()
+            expected = expected(scores)
+        actual = self.get_work(athletes, scores).magnitude
+        if not np.allclose(actual, expected, rtol=rtol, atol=0):
+            raise ValueError(
+                "work model does not match get_work (max abs error %g %s)"
+                % (np.max(np.abs(actual - expected)), self.work_units)
+            )
+        return self
+
+    def to_dict(self):
+        return {
+            "features": FEATURES,
+            "coefs": self.coefs.tolist(),
+            "num_scores": self.num_scores,
+            "work_units": self.work_units,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        assert d["features"] == FEATURES, "work model was compiled for other features"
+        return cls(d["coefs"], num_scores=d["num_scores"], work_units=d["work_units"])
+
+
+def compile_work_model(program, work_units="cal", verify=False):
+    """Compile `program`'s `get_work` into a `WorkModel`.
+
+    The coefficients are fitted exactly from the work of a fixed cohort of
+    probe athletes (and unit scores), computed with the regular movement
+    physics; `verify=True` then checks the model on other athletes and
+    scores. Raises ValueError if the work is not linear in the features.
+    """
+    cohort = _probe_cohort(seed=0)
+    work = program.get_work_cohort(cohort, work_units=work_units)
+    if type(work) == FunctionType:
+        num_scores = len(program.get_reps())
+        try:
+            rows = [work(list(e)) for e in np.eye(num_scores, dtype=int)]
+        except Exception as e:
+            raise ValueError("cannot compile score-dependent work: %s" % e)
+    else:
+        num_scores = None
+        rows = [work]
+    x = features(cohort)
+    coefs = np.stack([np.linalg.lstsq(x, y, rcond=None)[0] for y in rows])
+    if not np.allclose(x @ coefs.T, np.stack(rows, axis=1), rtol=1e-9, atol=1e-9):
+        raise ValueError("work is not linear in the athlete features")
+    model = WorkModel(coefs, num_scores=num_scores, work_units=work_units)
+    if verify:
+        model.verify(program)
+    return model
+
+
+def _probe_cohort(seed, size=2 * len(FEATURES)):
+    # independent random measurements, so the feature matrix has full rank
+    rng = np.random.default_rng(seed)
+    height = rng.uniform(1.5, 2.0, size)
+    return AthleteCohort(
+        weight=rng.uniform(50, 120, size),
+        height=height,
+        shoulder_height=height * rng.uniform(0.7, 0.85, size),
+        arm_length=height * rng.uniform(0.35, 0.45, size),
+        squat_bottom_height=height * rng.uniform(0.4, 0.5, size),
+    )
@@ -1,48 +1,27 @@
+import asyncio
+import io
 import json
+import random
 from types import FunctionType
 
 import pytest
+import textx
 import editdistance
 
 from fitest_lang.athlete import Athlete
+import fitest_lang.binary
 import fitest_lang.dsl
+import fitest_lang.fast_parser
+import fitest_lang.grammar_cache
+import fitest_lang.serialize
+from fitest_lang.expression import Value
+from fitest_lang.movement import MovementSeq
 from fitest_lang.program import Program, TaskPriorityBase, TaskPriority, TimePriorityBase, TimePriority
-from fitest_lang.quantity import Weight, Length, Work
-from fitest_lang.timer import Timers
-
-
-TEST_PROGRAMS = [
-    "1000 meter swim",
-    "5 km run",
-    "20 mile bike",
-    "20 min swim\n20 min bike",
-    "4 rounds:\n400 meter run\n75 meter swim\n1 min rest ;",
-    "AMRAP 18 min:\n600 meter run\n100 meter swim ;",
-    "2 km row\n1 mile run\n2 km row",
-    "400 meter run\n90 sec rest\n200 meter run\n60 sec rest\n100 meter run",
-    "AMRAP 20 min:\n5 handstand_pushup\n10 pistol\n15 pullup ;",
-    "AMRAP 20 min:\n5 pullup\n10 pushup\n15 squat ;",
-    "5 rounds:\n400 meter run\n15 95 lb barbell overhead_squat ;",
-    "3 rounds:\n50 squat\n7 muscle_up\n10 135 lb barbell hang_clean ;",
-    "3 rounds:\n50 squat\n7 muscle_up\n10 135 lb barbell hang_clean ;\n\n5 min rest\n\n"
-    + "3 rounds:\n25 squat\n3 muscle_up\n5 135 lb barbell hang_clean ;",
-    "150 20 lb 14 ft wallball",
-    "5 rounds:\n1 min 20 lb 14 ft wallball\n1 min airbike\n1 min double_under\n1 min rest ;",
-    "1500 meter row\n50 45 lb barbell thruster\n30 pullup",
-    "5 rounds:\n400 meter run\n30 20 inch box_jump\n30 20 lb 14 ft wallball ;",
-    "4 rounds:\nAMRAP 4 min:\n15 cal row\n15 20 lb 14 ft wallball\n15 pullup ;\n4 min rest ;",
-    "for N in 21 15 9:\nN 95 lb barbell thruster\nN pullup ;",
-    "for N1 in 21 15 9:\nN1 95 lb barbell thruster\nN1 pullup ;\n3 min rest\n\n"
-    + "for N2 in 15 12 9:\nN2 135 lb barbell thruster\nN2 burpee ;",
-    "for round in 4 3 2 1:\nAMRAP 4 min:\n(5 * round) cal row"
-    + "\n(5 * round) 20 lb 14 ft wallball\n(5 * round) pullup ;\n4 min rest ;",
-    "AMRAP 4 min:\n10 cal row\n10 20 lb 14 ft wallball\n10 pullup ;\n\n2 min rest"
-    + "\n\nAMRAP 4 min:\n15 cal row\n15 20 lb 14 ft wallball\n15 pullup ;\n\n2 min rest"
-    + "\n\nAMRAP 4 min:\n20 cal row\n20 20 lb 14 ft wallball\n20 pullup ;",
-    "for N in 100 80 60 40 20:\nN double_under\n(N / 2) situp\n(N / 10) 225 lb barbell deadlift ;",
-    "AMRAP 20 min:\n400 meter run\n30 20 lb 14 ft wallball\n20 pullup ; ",
-    "in 20 min:\n4 rounds:\n400 meter run\n30 20 lb 14 ft wallball\n20 pullup ; ;"
-]
+from fitest_lang.quantity import Quantity, Weight, Length, Time, Work
+from fitest_lang.runtime import FakeClock, Runtime, Session
+from fitest_lang.timer import Stopwatch, Timers
+
+from programs import TEST_PROGRAMS
 
 TEST_ATHLETE = Athlete("Tim", Weight(160, "lb"), Length(67, "in"))
 
@@ -75,6 +54,64 @@ def test_ir_to_json(program_str):
     assert type(j) == dict, "invalid json"
 
 
+@pytest.mark.parametrize("program_str", TEST_PROGRAMS)
+def test_serialize_dump(program_str):
+    p = Program.from_ir(fitest_lang.dsl.parse(program_str))
+    for top in [True, False]:
+        f = io.StringIO()
+        fitest_lang.serialize.dump(p, f, top=top)
+        assert json.loads(f.getvalue()) == (json.loads(p.to_json()) if top else p.to_ir())
+
+
+def test_serialize_dump_programs():
+    f = io.StringIO()
+    assert fitest_lang.serialize.dump_programs(TEST_PROGRAMS, f, sections=["ir"]) == len(TEST_PROGRAMS)
+    lines = f.getvalue().splitlines()
+    assert len(lines) == len(TEST_PROGRAMS) and list(json.loads(lines[0])) == ["type", "ir"]
+    f.seek(0)
+    for p, program_str in zip(fitest_lang.serialize.load_programs(f), TEST_PROGRAMS):
+        assert p.to_json() == Program.from_ir(fitest_lang.dsl.parse(program_str)).to_json()
+
+
+@pytest.mark.parametrize("program_str", TEST_PROGRAMS)
+def test_binary_ir(program_str):
+    p = Program.from_ir(fitest_lang.dsl.parse(program_str))
+    b = p.to_bytes()
+    assert len(b) < len(json.dumps(p.to_ir(), separators=(",", ":")))
+    assert json.dumps(fitest_lang.binary.decode(b)) == json.dumps(p.to_ir())
+    assert Program.from_bytes(b).to_json() == p.to_json()
+
+
+def test_binary_ir_values():
+    ir = {"a": [0, 127, 128, -1, -2 ** 70, 1.5, None, True, False], "b": {}, "é": ["é", ""]}
+    assert json.dumps(fitest_lang.binary.decode(fitest_lang.binary.encode(ir))) == json.dumps(ir)
+    b = fitest_lang.binary.encode(ir)
+    too_deep = b"FIR\x01" + b"\x06\x01" * 5000 + b"\x00"
+    for bad in [b"", b"{}", b[:3] + bytes([fitest_lang.binary.VERSION + 1]) + b[4:], b[:-1], b + b"\0", too_deep]:
+        with pytest.raises(ValueError):
+            fitest_lang.binary.decode(bad)
+
+
+def test_top_ir_sections(monkeypatch):
+    p = Program.from_ir(fitest_lang.dsl.parse("4 rounds:\n400 meter run\n75 meter swim\n1 min rest ;"))
+    seq = p.seq[0]
+    assert list(seq.to_ir(top=True)) == ["type", "timer_objs", "str", "ir"]
+    assert list(p.to_ir(top=True)) == ["type", "ir", "str"]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("section was not asked for")
+
+    monkeypatch.setattr(MovementSeq, "to_timer_objs", fail)
+    monkeypatch.setattr(MovementSeq, "__str__", fail)
+    assert seq.to_ir(top=True, sections=["ir"]) == {"type": "MovementSeq", "ir": seq.to_ir()}
+    assert json.loads(seq.to_json(sections=["ir"]))["ir"] == seq.to_ir()
+    monkeypatch.undo()
+    top = p.to_ir(top=True, sections=["str", "timer_objs"])
+    assert top["timer_objs"] == p.to_timer_objs().to_json() and top["str"] == str(p)
+    with pytest.raises(ValueError):
+        p.to_ir(top=True, sections=["html"])
+
+
 @pytest.mark.parametrize("program_str", TEST_PROGRAMS)
 def test_program_get_work(program_str):
     program = Program(Program.from_ir(fitest_lang.dsl.parse(program_str)), name='test_workout')
@@ -101,6 +138,39 @@ def test_program_ir_to_timer_objs(program_str):
     assert type(tos) == Timers, "results should be of type Timers"
     print(f"program type to timer object:\n{tos}")
 
+@pytest.mark.parametrize("program_str", TEST_PROGRAMS)
+def test_program_iter_timers(program_str):
+    program = Program(Program.from_ir(fitest_lang.dsl.parse(program_str)), name='test_workout')
+    timer_objs = program.to_timer_objs().to_list()
+    timers = program.iter_timers()
+    assert next(timers) == timer_objs[0]
+    assert list(timers) == timer_objs[1:]
+
+
+def test_iter_timers_shares_round_descs():
+    from fitest_lang.timer import RoundDesc
+
+    for program_str, kwargs in [
+        ("3 rounds:\n10 pullup\n20 situp ;", {"by_round": True}),
+        ("3 rounds:\nAMRAP 2 min:\n10 pullup\n20 situp ;;", {}),
+    ]:
+        program = Program.from_ir(fitest_lang.dsl.parse(program_str))
+        timer_objs = program.to_timer_objs(**kwargs).to_list()
+        assert len(timer_objs) >= 3 and all(type(t.desc) == RoundDesc for t in timer_objs)
+        assert len({id(t.desc.desc) for t in timer_objs}) == 1, "rounds share the seq's desc"
+        assert timer_objs[-1].__dict__()["desc"] == "round 3 of 3:\n" + timer_objs[0].desc.desc
+
+
+def test_iter_timers_time_capped_rounds():
+    program = Program.from_ir(fitest_lang.dsl.parse("3 rounds:\nin 5 min:\n10 pullup\n20 squat ;\n1 min rest ;"))
+    descs = [t["desc"] for t in program.to_timer_objs().to_json()]
+    assert descs[0] == "round 1 of 3:\n10 pullup\n20 squat"
+    assert descs[-1] == "round 3 of 3:\nrest"
+    program = Program.from_ir(fitest_lang.dsl.parse("for N in 3 2:\nin 5 min:\nN pullup ;;"))
+    descs = [t["desc"] for t in program.to_timer_objs().to_json()]
+    assert descs == ["round 1 of 2:\n3 pullup", "round 2 of 2:\n2 pullup"]
+
+
 @pytest.mark.parametrize("program_str", TEST_PROGRAMS)
 def test_program_ir_to_timer_obj_jsons(program_str):
     program = Program(Program.from_ir(fitest_lang.dsl.parse(program_str)), name='test_workout')
@@ -110,3 +180,697 @@ def test_program_ir_to_timer_obj_jsons(program_str):
     assert type(to_jsons) == list, "results should be of type list"
     print(f"program type to timer object json:\n{to_jsons}")
 
+
+
+def test_timeline():
+    program = Program.from_ir(fitest_lang.dsl.parse("4 rounds:\n10 pushup\n1 min rest ;\n3 rounds:\n5 pullup ;"))
+    timeline = program.to_timer_objs().to_timeline(splits=[30, 40])
+    assert len(timeline) == len(program.to_timer_objs().to_list())
+    assert timeline.start[:4].tolist() == [0, 30, 90, 130]
+    assert timeline.active([-1, 0, 29.9, 30, 100]).tolist() == [-1, 0, 0, 1, 2]
+    assert timeline.remaining([29.5, 100]).tolist() == [0.5, 30]
+    assert timeline.desc_at(35) == 'rest'
+    # the third stopwatch has no split yet, so it runs for good
+    assert timeline.remaining(1e6) == float('inf')
+
+    amrap = Program.from_ir(fitest_lang.dsl.parse("AMRAP 20 min:\n400 meter run\n20 pullup ; "))
+    timeline = amrap.to_timer_objs().to_timeline()
+    assert timeline.total_seconds() == 1200
+    assert timeline.active(1200) == -1 and timeline.remaining(1200) == 0
+    assert timeline.desc_at(600).startswith('AMRAP')
+    assert Timers([]).to_timeline().active(0) == -1
+
+    # a time cap in every round is one interval, described by its nested descs
+    capped = Program.from_ir(fitest_lang.dsl.parse("3 rounds:\nin 5 min:\n10 pullup\n20 squat ;\n1 min rest ;"))
+    timeline = capped.to_timer_objs().to_timeline()
+    assert timeline.desc_at(310) == 'round 1 of 3:\nrest'
+    assert timeline.desc_at(400) == 'round 2 of 3:\n10 pullup\n20 squat'
+    assert not any('Timers(' in d for d in timeline.descs)
+
+
+def test_runtime():
+    program = Program.from_ir(fitest_lang.dsl.parse("for N in 3 2:\nN min bike\nN min rest ;\n2 rounds:\n5 pullup ;"))
+    clock = FakeClock()
+    events = []
+
+    async def on_event(event):
+        events.append((event.kind, event.session.name, event.index, event.time))
+        if event.session.name == 'a' and event.kind == 'start' and event.index == 1:
+            runtime.pause(event.session)
+            clock.now += 30
+            runtime.resume(event.session)
+        if type(event.timer) == Stopwatch and event.kind == 'start':
+            runtime.skip(event.session)
+
+    runtime = Runtime(on_event, clock=clock, sleep=clock.sleep)
+
+    async def main():
+        runtime.start(Session(program.to_timer_objs(), name='a'))
+        runtime.start(Session(program.iter_timers(), name='b'))
+        await runtime.run()
+
+    asyncio.run(main())
+    ends = {name: [t for kind, n, _, t in events if kind == 'end' and n == name] for name in 'ab'}
+    assert ends['b'] == [180, 360, 480, 600, 600]
+    # the pause shifts every later boundary of 'a' by its length
+    assert ends['a'] == [180, 390, 510, 630, 630]
+    assert [kind for kind, n, _, _ in events if n == 'a'][-1] == 'finish'
+    assert not runtime.sessions
+
+
+def test_dsl_metamodel_cache():
+    fitest_lang.dsl.reset()
+    mm = fitest_lang.dsl.warmup()
+    assert fitest_lang.dsl.get_metamodel() is mm, "metamodel should be cached"
+    fitest_lang.dsl.parse(TEST_PROGRAMS[0])
+    assert fitest_lang.dsl.get_metamodel() is mm, "parse should reuse the cached metamodel"
+    fitest_lang.dsl.reset()
+    assert fitest_lang.dsl.get_metamodel() is not mm, "reset should drop the cached metamodel"
+
+
+def test_dsl_metamodel_grammar_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("FITEST_LANG_CACHE_DIR", str(tmp_path))
+    grammar = tmp_path / "run.tx"
+    grammar.write_text("Program: distance=INT 'meter' 'run' ;")
+    try:
+        fitest_lang.dsl.reset(grammar_path=grammar)
+        assert fitest_lang.dsl.parse("400 meter run").distance == 400
+    finally:
+        fitest_lang.dsl.reset()
+
+
+def test_grammar_cache_artifact(tmp_path):
+    file_name, grammar = fitest_lang.dsl._read_grammar()
+    path = fitest_lang.grammar_cache.write_artifact(grammar, cache_dir=tmp_path)
+    assert fitest_lang.grammar_cache.read_artifact(grammar, cache_dir=tmp_path) == path.read_bytes()
+    assert fitest_lang.grammar_cache.read_artifact(grammar + " ", cache_dir=tmp_path) is None, \
+        "artifact must be keyed by grammar content"
+    mm = fitest_lang.grammar_cache.metamodel_from_artifact(path.read_bytes(), file_name=file_name)
+    mm_textx = textx.metamodel_from_file(file_name)
+    for program_str in TEST_PROGRAMS:
+        expected = Program.from_ir(mm_textx.model_from_str(program_str)).to_json()
+        assert Program.from_ir(mm.model_from_str(program_str)).to_json() == expected
+
+
+def test_grammar_cache_fallback(tmp_path, monkeypatch):
+    import marshal
+
+    monkeypatch.setenv(fitest_lang.grammar_cache.CACHE_DIR_ENV, str(tmp_path))
+    file_name, grammar = fitest_lang.dsl._read_grammar()
+    try:
+        fitest_lang.dsl.reset(grammar_path=file_name)
+        assert fitest_lang.dsl.parse("400 meter run")
+        assert list(tmp_path.iterdir()) == [], "artifacts are only written on request"
+
+        versions, tree = marshal.loads(fitest_lang.grammar_cache.compile_artifact(grammar))
+        stale = marshal.dumps(((1,) + tuple(versions[1:]), tree))
+        with pytest.raises(fitest_lang.grammar_cache.ArtifactVersionError):
+            fitest_lang.grammar_cache.metamodel_from_artifact(stale)
+        for artifact in [stale, b"corrupt"]:
+            fitest_lang.grammar_cache.artifact_path(grammar).write_bytes(artifact)
+            fitest_lang.dsl.reset(grammar_path=file_name)
+            with pytest.warns(RuntimeWarning, match="grammar cache not used"):
+                assert fitest_lang.dsl.parse("400 meter run")
+    finally:
+        fitest_lang.dsl.reset()
+
+
+def _random_value(rng, var=None):
+    r = rng.random()
+    if var and r < 0.3:
+        return var
+    if var and r < 0.45:
+        return "(%s %s %d)" % (var, rng.choice("+-*/"), rng.randint(1, 10))
+    if r < 0.55:
+        return "(%d %s %d)" % (rng.randint(1, 30), rng.choice("+-*/"), rng.randint(1, 10))
+    if r < 0.6:
+        return "%d.%d" % (rng.randint(0, 9), rng.randint(0, 9))
+    return str(rng.randint(1, 400))
+
+
+def _random_quantity(rng, units, var=None):
+    return _random_value(rng, var) + " " + rng.choice(units)
+
+
+def _random_movement(rng, var=None, time_priority=False):
+    time_units = ["sec", "min", "hr"]
+    length_units = ["meter", "km", "mile", "ft", "inch"]
+    weight_units = ["lb", "pound", "kg", "kilogram"]
+    magnitude = (
+        _random_quantity(rng, time_units, var) if time_priority else _random_value(rng, var)
+    )
+    kind = rng.randrange(4)
+    if kind == 0:
+        if not time_priority:
+            magnitude = _random_quantity(rng, rng.choice([length_units, ["cal", "J"]]), var)
+        return magnitude + " " + rng.choice(["run", "swim", "bike", "ski", "airbike", "row"])
+    if kind == 1:
+        obj, mvmt = rng.choice([
+            ("barbell", "clean"), ("dumbells", "clean_and_jerk"), ("barbell", "deadlift"),
+            ("kettlebell", "sumodeadlift_highpull"), ("barbell", "thruster"),
+            ("barbell", "back_squat"), ("dumbell", "snatch"), ("barbells", "snatch"),
+            ("kettlebells", "bench_press"), ("kettlebell", "swing"), ("dumbbell", "swing"),
+            ("barbell", "hang_clean"), ("barbell", "overhead_squat"),
+        ])
+        return " ".join([magnitude, _random_quantity(rng, weight_units), obj, mvmt])
+    if kind == 2:
+        return " ".join([magnitude, _random_quantity(rng, weight_units),
+                         _random_quantity(rng, length_units), "wallball"])
+    mvmt = rng.choice([
+        "pushup", "pullup", "burpee", "burpee_pullup", "situp", "ghd_situp", "knee_to_elbow",
+        "toe_to_bar", "back_extension", "hip_extension", "dip", "muscle_up", "pistol", "squat",
+        "handstand_pushup", "double_under", "box_jump", "handstand_walk",
+    ])
+    if mvmt == "box_jump":
+        mvmt = _random_quantity(rng, length_units) + " " + mvmt
+    return magnitude + " " + mvmt
+
+
+def _random_rest(rng):
+    return "\n" + _random_quantity(rng, ["sec", "min"]) + " rest" if rng.random() < 0.2 else ""
+
+
+def _random_seq(rng, var=None, time_priority=None):
+    if time_priority is None:
+        time_priority = rng.random() < 0.2
+    return "\n".join(
+        _random_movement(rng, var, time_priority) + _random_rest(rng)
+        for _ in range(rng.randint(1, 4))
+    )
+
+
+def _random_block(rng, kind):
+    if kind == "AMRAP":
+        return "AMRAP %s:\n%s ;%s" % (
+            _random_quantity(rng, ["sec", "min"]),
+            _random_seq(rng) if rng.random() < 0.8 else _random_block(rng, "rounds"),
+            _random_rest(rng),
+        )
+    if kind == "in":
+        return "in %s:\n%s ;%s" % (
+            _random_quantity(rng, ["min", "hr"]),
+            _random_seq(rng) if rng.random() < 0.5 else _random_block(rng, "rounds"),
+            _random_rest(rng),
+        )
+    if rng.random() < 0.5:
+        var = rng.choice(["N", "R", "round"])
+        head = "for %s in %s" % (var, " ".join(str(rng.randint(1, 30)) for _ in range(rng.randint(1, 4))))
+    else:
+        var = None
+        head = _random_quantity(rng, ["rounds", "cycles", "reps"])
+    r = rng.random()
+    if r < 0.7:
+        body = _random_seq(rng, var)
+    else:
+        body = _random_block(rng, rng.choice(["AMRAP", "in"]))
+    return "%s:\n%s ;%s" % (head, body, _random_rest(rng))
+
+
+def _random_program(rng):
+    kind = rng.choice(["seq", "AMRAP", "in", "rounds"])
+    if kind == "seq":
+        return _random_seq(rng)
+    return "\n\n".join(_random_block(rng, kind) for _ in range(rng.randint(1, 3)))
+
+
+def _mutate(rng, s):
+    tokens = s.split(" ")
+    i = rng.randrange(len(tokens))
+    op = rng.randrange(5)
+    if op == 0:
+        del tokens[i]
+    elif op == 1:
+        tokens.insert(i, tokens[i])
+    elif op == 2 and i + 1 < len(tokens):
+        tokens[i], tokens[i + 1] = tokens[i + 1], tokens[i]
+    elif op == 3 and i + 1 < len(tokens):
+        tokens[i:i + 2] = [tokens[i] + tokens[i + 1]]
+    else:
+        tokens.insert(i, rng.choice([":", ";", "(", ")", "in", "rest", "N", "1.5", "x"]))
+    return " ".join(tokens)
+
+
+def _same_model(textx_obj, fast_obj):
+    if isinstance(fast_obj, fitest_lang.fast_parser.Node):
+        if type(textx_obj).__name__ != type(fast_obj).__name__:
+            return False
+        if type(fast_obj) == fitest_lang.fast_parser.Variable and textx_obj.name != fast_obj.name:
+            return False
+        return all(
+            _same_model(getattr(textx_obj, k), v)
+            for k, v in fast_obj.__dict__.items()
+            if not (k == "type" and v is not None and textx_obj.type.name == v.name)
+        )
+    if type(fast_obj) == list:
+        return len(textx_obj) == len(fast_obj) and all(map(_same_model, textx_obj, fast_obj))
+    return type(textx_obj) == type(fast_obj) and textx_obj == fast_obj
+
+
+def _parse_outcome(program_str, engine):
+    try:
+        return fitest_lang.dsl.parse(program_str, engine=engine), None
+    except Exception as e:
+        return None, type(e)
+
+
+@pytest.mark.parametrize("program_str", TEST_PROGRAMS)
+def test_fast_parser(program_str):
+    textx_model = fitest_lang.dsl.parse(program_str)
+    fast_model = fitest_lang.dsl.parse(program_str, engine="fast")
+    assert _same_model(textx_model, fast_model), "fast parser model differs from textX"
+    assert Program.from_ir(fast_model).to_json() == Program.from_ir(textx_model).to_json()
+
+
+def test_fast_parser_fuzz():
+    rng = random.Random(0)
+    for _ in range(300):
+        program_str = _random_program(rng)
+        if rng.random() < 0.5:
+            program_str = _mutate(rng, program_str)
+        textx_model, textx_error = _parse_outcome(program_str, "textx")
+        fast_model, fast_error = _parse_outcome(program_str, "fast")
+        assert textx_error == fast_error, f"engines disagree on {program_str!r}"
+        if textx_error is None:
+            assert _same_model(textx_model, fast_model), f"models differ for {program_str!r}"
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_dsl_parse_many(workers):
+    programs = TEST_PROGRAMS + ["not a program"] + TEST_PROGRAMS[:3]
+    results = fitest_lang.dsl.parse_many(programs, workers=workers, chunksize=4)
+    assert len(results) == len(programs), "one result per input"
+    for program_str, result in zip(programs, results):
+        if program_str == "not a program":
+            assert isinstance(result, fitest_lang.dsl.ParseError)
+            assert result.line == 1
+        else:
+            expected = Program.from_ir(fitest_lang.dsl.parse(program_str))
+            assert result.to_json() == expected.to_json(), "results must keep input order"
+
+
+def test_dsl_program_cache():
+    cache = fitest_lang.dsl.program_cache
+    maxsize = cache.maxsize
+    try:
+        cache.clear()
+        cache.resize(2)
+        p1 = fitest_lang.dsl.parse_program(TEST_PROGRAMS[18])
+        p2 = fitest_lang.dsl.parse_program("  for N in 21 15 9:\n\nN 95 lb barbell thruster N pullup ;")
+        assert cache.stats()["hits"] == 1, "whitespace variants should share an entry"
+        assert p1 is not p2 and p1.to_json() == p2.to_json()
+        p1.reps[0].ints.append(1)
+        p2.reps[0].ints.append(3)
+        assert fitest_lang.dsl.parse_program(TEST_PROGRAMS[18]).reps[0].ints == [21, 15, 9], \
+            "cached programs must not be affected by callers' mutations"
+        fitest_lang.dsl.parse_program(TEST_PROGRAMS[0])
+        fitest_lang.dsl.parse_program(TEST_PROGRAMS[1])
+        assert cache.stats() == {"hits": 2, "misses": 3, "evictions": 1, "size": 2, "maxsize": 2}
+    finally:
+        cache.resize(maxsize)
+        cache.clear()
+
+
+@pytest.mark.parametrize("program_str", TEST_PROGRAMS)
+def test_program_from_json(program_str):
+    p = Program.from_ir(fitest_lang.dsl.parse(program_str))
+    q = Program.from_json(p.to_json())
+    assert type(q) == type(p)
+    assert q.to_json() == p.to_json(), "from_json must round-trip to_json"
+    assert Program.from_dict(p.to_ir()).to_ir() == p.to_ir()
+    wrapped = Program(p)
+    assert Program.from_dict(wrapped.to_ir()).to_ir() == wrapped.to_ir()
+
+
+def test_type_dispatch_table():
+    from fitest_lang.baseobject import FitestObject
+    from fitest_lang.expression import Value, Variable
+    from fitest_lang.quantity import Time
+
+    for engine in ["textx", "fast"]:
+        model = fitest_lang.dsl.parse("for N in 3 2 1:\nAMRAP 1 min:\nN pullup ;;", engine=engine)
+        assert FitestObject.textx_type_class(model) == TaskPriority
+        assert FitestObject.textx_type_class(model.reps[0]) == Variable
+        assert FitestObject.textx_type_class(model.seq[0].time[0]) == Time
+        assert FitestObject.textx_type_class(model.seq[0].seq[0].movements[0].magnitude) == Value
+    assert FitestObject.ir_type_class({"quantity.Time": {}}) == Time
+    with pytest.raises(TypeError):
+        FitestObject.textx_type_class(object())
+
+
+def test_expression_compile():
+    import pickle
+
+    program = Program.from_ir(
+        fitest_lang.dsl.parse("for N in 21 15 9:\n((N + 1) / 2 * 3) pullup\n(N) situp ;")
+    )
+    (pullups, situps) = program.seq[0].movements
+    expr = pullups.magnitude.val
+    assert [expr.eval_exprs({"N": n}) for n in [21, 15, 9]] == [33, 24, 15]
+    assert expr.compile() is expr.compile()
+    assert expr.to_str({"N": 21}, eval_exprs=True) == "33"
+    assert situps.magnitude.eval_exprs({"N": 9}) == 9
+    assert situps.magnitude.to_str({}, eval_exprs=True) == "N"
+    with pytest.raises(KeyError):
+        expr.eval_exprs({})
+    assert pickle.loads(pickle.dumps(expr)).eval_exprs({"N": 9}) == 15
+
+
+def test_rep_ladder_vectorized():
+    import numpy as np
+
+    ints = list(range(200, 0, -2))
+    program = Program.from_ir(
+        fitest_lang.dsl.parse(
+            "for N in " + " ".join(map(str, ints)) + ":\nN double_under\n(N / 2) situp\n"
+            + "(N / 10) 225 lb barbell deadlift\n(N * 10) meter run ;"
+        )
+    )
+    seq = program.seq[0]
+    ladder = seq.movements[1].magnitude.eval_exprs({"N": np.array(ints)})
+    assert ladder.tolist() == [n // 2 for n in ints]
+    assert program.get_reps() == [seq.get_reps(env={"N": n}) for n in ints]
+    works = program.get_work(TEST_ATHLETE, by_round=True)
+    assert len(works) == len(ints)
+    for n, w in zip([ints[0], ints[-1]], [works[0], works[-1]]):
+        assert w.to("cal").magnitude == pytest.approx(
+            seq.get_work(TEST_ATHLETE, env={"N": n}).to("cal").magnitude
+        )
+    per_round = [seq.describe(env={"N": n}) for n in ints]
+    assert program.describe() == pytest.approx(
+        {k: np.mean([d[k] for d in per_round]) for k in per_round[0]}, abs=1e-3
+    )
+
+
+def test_fold_constants():
+    from fitest_lang.expression import fold_constants
+
+    program_str = "for N in 3 2:\n(5 * 4) pullup\n(N * (2 + 3)) situp\n(21 + 0) squat ;"
+    program = Program.from_ir(fitest_lang.dsl.parse(program_str))
+    (pullups, situps, squats) = program.seq[0].movements
+    fn = situps.magnitude.compile()
+    assert situps.magnitude.variables() == {"N"}
+    assert pullups.magnitude.variables() == frozenset()
+
+    assert fold_constants(program) == [("5 * 4", 20), ("2 + 3", 5), ("21 + 0", 21)]
+    assert fold_constants(program) == []
+    assert str(pullups) == "20 pullup"
+    assert situps.magnitude.compile() is not fn
+    assert program.get_reps() == [[20, 15, 21], [20, 10, 21]]
+    assert program.get_reps() == Program.from_ir(fitest_lang.dsl.parse(program_str)).get_reps()
+    assert Program.from_dict(program.to_ir()).to_ir() == program.to_ir()
+    assert str(Program.from_ir(fitest_lang.dsl.parse(program_str), fold=True)) == str(program)
+
+    # a division by zero stays unfolded and fails when evaluated, as before
+    program = Program.from_ir(fitest_lang.dsl.parse("for N in 3 2:\n(1 / 0) pullup\n(2 + 3) situp ;"))
+    unfolded = str(program.seq[0].movements[0])
+    assert fold_constants(program) == [("2 + 3", 5)]
+    assert str(program.seq[0].movements[0]) == unfolded
+    with pytest.raises(ZeroDivisionError):
+        program.get_reps()
+
+
+def test_si_units_agree_with_pint():
+    from fitest_lang.expression import Value
+    from fitest_lang.quantity import PINT, SI, SI_FACTORS, Quantity, Time, si_factor
+
+    for unit in list(SI_FACTORS):
+        assert si_factor(unit) == pytest.approx(Quantity(1, unit).to_base_units().magnitude)
+    assert (Length(1, "mile") + Length(100, "meter")).to_si() == pytest.approx(1709.344)
+
+    programs = [
+        "1 mile run\n400 meter swim\n5 km bike\n10 pushup\n10 burpee\n10 pullup\n"
+        + "10 squat\n10 double_under\n10 20 inch box_jump\n10 135 lb barbell deadlift\n"
+        + "10 135 lb barbell thruster\n10 24 kg kettlebell swing\n20 20 lb 10 ft wallball\n"
+        + "10 95 lb barbell clean\n10 ghd_situp\n10 muscle_up",
+        "1 min 20 lb 14 ft wallball\n1 min pullup\n1 min run",
+    ]
+    mvmts = [m for s in programs for m in Program.from_ir(fitest_lang.dsl.parse(s)).movements]
+    for mvmt in mvmts:
+        works = [mvmt.get_work(TEST_ATHLETE, measure=m) for m in [SI, PINT]]
+        if type(works[0]) == FunctionType:
+            score = Time(Value(300), "sec") if type(mvmt.magnitude) != Time else Value(25)
+            works = [w(score) for w in works]
+        if works[0] is None:
+            continue
+        si_work, pint_work = [w.to("cal").magnitude for w in works]
+        assert si_work == pytest.approx(pint_work, rel=1e-9), str(mvmt)
+
+
+def test_quantity_arithmetic_keeps_pint_units():
+    # the float fast paths return what pint arithmetic did
+    t = Program.from_ir(fitest_lang.dsl.parse("20 min swim\n20 min bike")).get_time()
+    assert t.magnitude == 40 and type(t.magnitude) == int
+    assert str(t.units) == "minute"
+    assert str((Time(Value(3), "min") * 2).units) == "minute"
+    assert (Time(1, "min") + Time(30, "sec")).magnitude == pytest.approx(1.5)
+    # mixed units keep ints where pint's conversion factor is integral
+    t = Program.from_ir(fitest_lang.dsl.parse("304 sec double_under\n(8 * 6) min ski")).get_time()
+    assert t.magnitude == 3184 and type(t.magnitude) == int
+    for cls, a, b in [(Weight, "kg", "lb"), (Length, "inch", "ft"), (Time, "min", "hr"), (Time, "sec", "hr")]:
+        q = cls(7, a) + cls(48, b)
+        expected = Quantity(7, a) + Quantity(48, b)
+        assert q.magnitude == expected.magnitude and type(q.magnitude) == type(expected.magnitude)
+
+
+def test_athlete_derived_measures():
+    import pickle
+
+    athlete = Athlete("Tim", Weight(160, "lb"), Length(67, "in"))
+    assert not hasattr(athlete, "__dict__")
+    si = athlete.si
+    assert athlete.si is si
+    assert si.mass == pytest.approx(72.5747784)
+    assert si.weight == pytest.approx(athlete.get_weight().to("newton").magnitude)
+    assert si.arm_length == pytest.approx(0.4 * 67 * 0.0254)
+    assert athlete.quantities.weight is athlete.get_weight()
+    assert athlete == pickle.loads(pickle.dumps(athlete))
+    assert hash(athlete) == hash(TEST_ATHLETE)
+
+    work = athlete.si.weight * athlete.si.arm_length
+    athlete.arm_length = 2 * athlete.arm_length
+    assert athlete.si.arm_length == pytest.approx(2 * si.arm_length)
+    assert athlete != TEST_ATHLETE
+    pullups = Program.from_ir(fitest_lang.dsl.parse("1 pullup")).movements[0]
+    assert pullups.get_work(athlete).to("J").magnitude == pytest.approx(2 * work)
+
+
+@pytest.mark.parametrize("program_str", [
+    "5 km run\n150 20 lb 14 ft wallball",
+    "3 rounds:\n50 squat\n7 muscle_up\n10 135 lb barbell hang_clean ;",
+    "for N in 100 80 60 40 20:\nN double_under\n(N / 2) situp\n(N / 10) 225 lb barbell deadlift ;",
+    "in 20 min:\n4 rounds:\n400 meter run\n30 20 lb 14 ft wallball\n20 pullup ; ;",
+    # time caps mixing a plain seq block with round blocks
+    "in 20 min:\n400 meter run\n20 pullup ;\nin 10 min:\n5 rounds:\n10 pullup ; ;",
+    "in 10 min:\nfor N in 5 3:\nN pullup ; ;\nin 20 min:\n400 meter run ;",
+])
+def test_program_get_work_cohort(program_str):
+    from fitest_lang.athlete import AthleteCohort
+
+    athletes = [
+        Athlete(str(i), Weight(110 + 7 * i, "lb"), Length(60 + i, "in")) for i in range(12)
+    ]
+    cohort = AthleteCohort.from_athletes(athletes)
+    program = Program.from_ir(fitest_lang.dsl.parse(program_str))
+    work = program.get_work_cohort(cohort)
+    assert work.shape == (len(athletes),)
+    assert work == pytest.approx(
+        [program.get_work(a).to("cal").magnitude for a in athletes], rel=1e-9
+    )
+    assert len(cohort.si.mass) == 12
+    cohort.height = 2 * cohort.height
+    assert cohort.si.height[:, 0] == pytest.approx(2 * cohort.shoulder_height / 0.75)
+
+
+@pytest.mark.parametrize("program_str", [
+    "5 km run\n150 20 lb 14 ft wallball",
+    "for N in 21 15 9:\nN 95 lb barbell thruster\nN pullup ;",
+    "AMRAP 20 min:\n400 meter run\n30 20 lb 14 ft wallball\n20 pullup ;",
+])
+def test_compile_work_model(program_str):
+    from fitest_lang.work_model import WorkModel, compile_work_model
+
+    program = Program.from_ir(fitest_lang.dsl.parse(program_str))
+    model = compile_work_model(program, verify=True)
+    model = WorkModel.from_dict(json.loads(json.dumps(model.to_dict())))
+    expected = program.get_work(TEST_ATHLETE)
+    if model.num_scores is None:
+        actual = model.get_work(TEST_ATHLETE)
+    else:
+        actual = model.get_work(TEST_ATHLETE, scores=[7])
+        expected = expected([7])
+    assert actual.to("cal").magnitude == pytest.approx(expected.to("cal").magnitude, rel=1e-9)
+
+
+def test_compile_work_model_rejects_nonlinear_work():
+    from fitest_lang.work_model import compile_work_model
+
+    with pytest.raises(ValueError):
+        compile_work_model(Program.from_ir(fitest_lang.dsl.parse("1000 meter swim")))
+
+
+@pytest.mark.parametrize("program_str,scores", [
+    ("AMRAP 20 min:\n400 meter run\n30 20 lb 14 ft wallball\n20 pullup ;", lambda s: [s]),
+    ("20 min swim\n20 min bike", lambda s: [s, s]),
+    ("5 rounds:\n1 min 20 lb 14 ft wallball\n1 min airbike\n1 min double_under\n1 min rest ;",
+     lambda s: [[s, s, s]] * 5),
+])
+def test_work_fcn_score_arrays(program_str, scores):
+    import numpy as np
+
+    work_fcn = Program.from_ir(fitest_lang.dsl.parse(program_str)).get_work(TEST_ATHLETE)
+    leaderboard = np.arange(1, 101)
+    work = work_fcn(scores(leaderboard)).to("cal").magnitude
+    assert work.shape == leaderboard.shape
+    assert work == pytest.approx(
+        [work_fcn(scores(int(s))).to("cal").magnitude for s in leaderboard], rel=1e-9
+    )
+
+
+def test_get_power():
+    import numpy as np
+    from fitest_lang.athlete import AthleteCohort
+    from fitest_lang.power import percentile_rank, rank, top_k
+
+    def parse(s):
+        return Program.from_ir(fitest_lang.dsl.parse(s))
+
+    fran = parse("for N in 21 15 9:\nN 95 lb barbell thruster\nN pullup ;")
+    work = fran.get_work(TEST_ATHLETE).to("J").magnitude
+    assert fran.get_power(TEST_ATHLETE, Time(5, "min")).to("watt").magnitude == pytest.approx(
+        work / 300
+    )
+
+    amrap = parse("AMRAP 20 min:\n5 pullup\n10 pushup\n15 squat ;")
+    one_round = amrap.get_power(TEST_ATHLETE, [1]).magnitude
+    assert amrap.get_power(TEST_ATHLETE, [(3, 30)]).magnitude == pytest.approx(4 * one_round)
+    assert amrap.get_power(TEST_ATHLETE, [(3, 5)]).magnitude > 3 * one_round
+
+    capped = parse("in 20 min:\n4 rounds:\n400 meter run\n30 20 lb 14 ft wallball\n20 pullup ; ;")
+    full_reps = sum([sum(rs) for rs in capped.seq[0].get_reps()])
+    assert capped.get_power(TEST_ATHLETE, [full_reps + 10]).to("watt").magnitude == pytest.approx(
+        capped.get_work(TEST_ATHLETE).to("J").magnitude / 1200
+    )
+
+    athletes = [
+        Athlete(str(i), Weight(110 + 7 * i, "lb"), Length(60 + i, "in")) for i in range(12)
+    ]
+    cohort = AthleteCohort.from_athletes(athletes)
+    rounds, reps = np.arange(1, 13), np.arange(12) * 3
+    powers = amrap.get_power(cohort, [(rounds, reps)])
+    assert powers.magnitude == pytest.approx(
+        [amrap.get_power(a, [(r, n)]).magnitude for a, r, n in zip(athletes, rounds, reps)]
+    )
+    best = top_k(powers, 3)
+    assert list(rank(powers)[best]) == [1, 2, 3]
+    assert percentile_rank(powers)[best[0]] == pytest.approx(100 * 11 / 12)
+
+
+
+def test_get_power_movement_seq():
+    seq = Program.from_ir(fitest_lang.dsl.parse("1500 meter row\n50 45 lb barbell thruster\n30 pullup"))
+    assert type(seq) == MovementSeq
+    work = seq.get_work(TEST_ATHLETE).to("J").magnitude
+    power = Program(seq).get_power(TEST_ATHLETE, [600, 900]).to("watt").magnitude
+    assert power.tolist() == pytest.approx([work / 600, work / 900])
+    # movements done for time: one score per movement over the seq's time
+    for_time = Program.from_ir(fitest_lang.dsl.parse("20 min swim\n20 min bike"))
+    work = for_time.get_work(TEST_ATHLETE)([1000, 8000]).to("J").magnitude
+    assert for_time.get_power(TEST_ATHLETE, [1000, 8000]).to("watt").magnitude == pytest.approx(work / 2400)
+
+def test_execution_plan():
+    import pickle
+    from fitest_lang.expression import fold_constants
+
+    program = Program.from_ir(
+        fitest_lang.dsl.parse("for N in 21 15 9:\nN pullup\n(2 * 5) pushup ;\n1 min rest")
+    )
+    plan = program.plan
+    assert [r.env for r in plan.rounds] == [{"N": 21}, {"N": 15}, {"N": 9}]
+    assert program.get_reps() == [[21, 10], [15, 10], [9, 10]]
+    program.get_time()
+    program.describe()
+    program.get_work(TEST_ATHLETE)
+    assert len(program.to_timer_objs().to_list()) == 4
+    assert program.plan is plan
+    assert "_plan" not in pickle.loads(pickle.dumps(program)).__dict__
+
+    fold_constants(program)
+    assert program.plan is not plan
+    plan = program.plan
+    program.rest = []
+    assert program.plan is not plan
+    assert list(map(str, program.get_time())) == list(map(str, program.plan.get_time(by_mvmt=False)))
+    # a block without rounds still has its rest
+    program = Program.from_ir(fitest_lang.dsl.parse("(1 - 2) rounds:\n10 pullup ;\n1 min rest"))
+    assert [t.magnitude for t in program.get_time()] == [1]
+
+
+def test_execution_plan_nested_mutation():
+    from fitest_lang.expression import Value
+
+    program = Program.from_ir(fitest_lang.dsl.parse("for N in 21 15 9:\nN pullup\n10 pushup ;"))
+    assert program.get_reps() == [[21, 10], [15, 10], [9, 10]]
+    program.reps[0].ints[:] = [5, 3]
+    assert str(program).startswith("for N in 5 3")
+    assert program.get_reps() == [[5, 10], [3, 10]]
+    assert len(program.plan.describe()) == 2
+    program.seq[0].movements[1].magnitude = Value(20)
+    assert program.get_reps() == [[5, 20], [3, 20]]
+
+
+def test_describe_without_pandas():
+    import pandas as pd
+    from fitest_lang.program import _mean_rows, describe_many
+
+    rows = [
+        {"movement.gymnastic": 0.25, "movement.object": 0.75},
+        {"rest": 1.0},
+        {"movement.object": 0.3337, "work": {"pullup": 1.0}},
+    ]
+    expected = pd.DataFrame(rows)
+    expected["rest"] = expected["rest"].fillna(0.0)
+    expected = expected.mean(numeric_only=True).round(3).to_dict()
+    assert _mean_rows(rows) == expected
+
+    program_strs = TEST_PROGRAMS[:4]
+    df = describe_many(program_strs + [Program.from_ir(fitest_lang.dsl.parse(TEST_PROGRAMS[4]))])
+    assert len(df) == 5
+    for (_, row), program_str in zip(df.iterrows(), TEST_PROGRAMS[:5]):
+        desc = Program.from_ir(fitest_lang.dsl.parse(program_str)).describe()
+        desc = dict(desc.get("work", desc), **({"rest": desc["rest"]} if "rest" in desc else {}))
+        assert {k: v for k, v in row.items() if v} == {k: v for k, v in desc.items() if v}
+
+
+@pytest.mark.parametrize(
+    "program_str, expected",
+    [
+        ("3 rounds:\nin 5 min:\n10 pullup ; ;", {"pullup": 1.0}),
+        ("for N in 3 2:\nin 5 min:\nN pullup ; ;", {"pullup": 1.0}),
+        ("for N in 3 2:\nin 5 min:\nN pullup\n(2 * N) 95 lb barbell thruster ; ;", {"pullup": 0.333, "thruster": 0.667}),
+    ],
+)
+def test_describe_time_capped_rounds(program_str, expected):
+    program = Program.from_ir(fitest_lang.dsl.parse(program_str))
+    assert program.describe(by="mvmt_type") == expected
+
+
+def test_lazy_imports():
+    import subprocess
+    import sys
+
+    code = "\n".join([
+        "import sys",
+        "import fitest_lang.dsl, fitest_lang.program",
+        "program = fitest_lang.dsl.parse_program('for N in 21 15 9:\\nN pullup ;', engine='fast')",
+        "str(program), program.to_ir(), program.to_timer_objs()",
+        "heavy = ['numpy', 'pint', 'pandas', 'textx']",
+        "print(' '.join(m for m in heavy if type(sys.modules.get(m)).__name__ == 'module'))",
+    ])
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ""
+
+    from fitest_lang.quantity import Quantity
+
+    q = Quantity(1, "meter")
+    assert type(q) == Quantity and isinstance(q, Quantity)
+    assert type(Length(1, "meter")) != Quantity